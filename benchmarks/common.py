@@ -0,0 +1,118 @@
+"""
+Helper functions shared by the benchmark scripts.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), 'examples')
+NODE_RUNNER = os.path.join(os.path.dirname(BENCHMARK_DIR), 'brian2wasm', 'templates',
+                           'node_runner.js')
+
+
+def bundled_examples():
+    """
+    List the example scripts bundled with brian2wasm.
+
+    Parameters
+    ----------
+    None
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list of str
+        The paths of the example scripts, sorted by name.
+    """
+    return sorted(os.path.join(EXAMPLES_DIR, f) for f in os.listdir(EXAMPLES_DIR)
+                  if f.endswith('.py'))
+
+
+def build_example(example, build_dir, preferences=None, source=None):
+    """
+    Build an example in a new directory.
+
+    Parameters
+    ----------
+    example : str
+        Path of the example script.
+    build_dir : str
+        Directory in which the example is run; the project directory will be
+        created inside of it.
+    preferences : dict, optional
+        Preferences of the ``devices.wasm_standalone`` category (e.g.
+        ``{'simd': True}``) to set for the build.
+    source : str, optional
+        Source code to run instead of the content of the example script
+        (e.g. a modified version of it). An HTML file next to the example is
+        copied to the build directory, so that it is used as before.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the build fails.
+    RuntimeError
+        If the project directory cannot be found after the build.
+
+    Returns
+    -------
+    str
+        The project directory.
+    """
+    os.makedirs(build_dir, exist_ok=True)
+    # Brian reads preferences from a file in the current directory
+    with open(os.path.join(build_dir, 'brian_preferences'), 'w') as f:
+        for name, value in (preferences or {}).items():
+            f.write(f'devices.wasm_standalone.{name} = {value!r}\n')
+    script = os.path.abspath(example)
+    if source is not None:
+        script = os.path.join(build_dir, os.path.basename(example))
+        with open(script, 'w') as f:
+            f.write(source)
+        html_file = os.path.splitext(example)[0] + '.html'
+        if os.path.exists(html_file):
+            shutil.copy(html_file, build_dir)
+    env = dict(os.environ, BRIAN2WASM_NO_SERVER='1')
+    subprocess.run([sys.executable, script], cwd=build_dir,
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    directories = [d for d in os.listdir(build_dir)
+                   if os.path.exists(os.path.join(build_dir, d, 'wasm_module.wasm'))]
+    if len(directories) != 1:
+        raise RuntimeError(f"Could not find the project directory for '{example}'.")
+    return os.path.join(build_dir, directories[0])
+
+
+def run_project(project_dir, node='node'):
+    """
+    Run a compiled project in Node.js.
+
+    Parameters
+    ----------
+    project_dir : str
+        The project directory.
+    node : str, optional
+        The Node.js executable. Default is ``'node'``.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the simulation fails.
+
+    Returns
+    -------
+    dict
+        The measurements reported by ``node_runner.js``: the wall-clock time
+        of the simulation (``"time"``, in ms), the number of simulated time
+        steps (``"steps"``), the simulated time (``"simulated"``, in
+        seconds), the compilation time of the module (``"compile"``, in ms),
+        and the durations of the phases of the run (``"timings"``, in ms).
+    """
+    output = subprocess.run([node, NODE_RUNNER, project_dir],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
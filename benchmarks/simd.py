@@ -0,0 +1,72 @@
+"""
+Compare the simulation speed of the examples with and without WASM SIMD.
+
+Every example is built twice (with ``prefs.devices.wasm_standalone.simd``
+set to ``False`` and ``True``), and the resulting modules are run in Node.js
+(with ``brian2wasm/templates/node_runner.js``). The script prints the number
+of simulated time steps per second for both builds.
+
+Usage::
+
+    python benchmarks/simd.py [--repeats N] [--node NODE] [example.py ...]
+
+Needs an activated (or configured) EMSDK and Node.js >= 18.
+"""
+import argparse
+import os
+import tempfile
+
+from common import build_example, bundled_examples, run_project
+
+
+def steps_per_second(project_dir, node='node'):
+    """
+    Measure the simulation speed of a compiled project in Node.js.
+
+    Parameters
+    ----------
+    project_dir : str
+        The project directory.
+    node : str, optional
+        The Node.js executable. Default is ``'node'``.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the simulation fails.
+
+    Returns
+    -------
+    float
+        The number of simulated time steps per second.
+    """
+    result = run_project(project_dir, node)
+    return result['steps'] / (result['time'] / 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('examples', nargs='*',
+                        help='Example scripts (default: all bundled examples)')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Number of runs per build, the best one is reported')
+    parser.add_argument('--node', default='node', help='Node.js executable')
+    args = parser.parse_args()
+    examples = args.examples or bundled_examples()
+    print(f"{'example':40s} {'scalar (steps/s)':>18s} {'SIMD (steps/s)':>18s} {'speedup':>8s}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for example in examples:
+            name = os.path.splitext(os.path.basename(example))[0]
+            speed = {}
+            for simd in (False, True):
+                project_dir = build_example(example,
+                                            os.path.join(tmp_dir, name, 'simd' if simd else 'scalar'),
+                                            {'simd': simd})
+                speed[simd] = max(steps_per_second(project_dir, args.node)
+                                  for _ in range(args.repeats))
+            print(f"{name:40s} {speed[False]:18.0f} {speed[True]:18.0f} "
+                  f"{speed[True] / speed[False]:7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+"""
+Measure build time, bundle size, and simulation speed of the examples.
+
+Every example is built at several sizes (by scaling the number of neurons,
+i.e. the first module-level assignment of an integer to ``N`` or ``n``), and
+the resulting modules are run in Node.js (with
+``brian2wasm/templates/node_runner.js``). For every build, the script records
+
+* the time for generating the code and for compiling it with ``emcc`` (from
+  ``build_timings.json``),
+* the size of ``wasm_module.wasm``, ``wasm_module.js``, and
+  ``wasm_module.data``, uncompressed and compressed (from
+  ``size_report.json``),
+* the time for instantiating the module, the number of simulated seconds per
+  wall-clock second, and the time for copying the results out of the
+  WebAssembly memory (best of all repeats, measured by the worker).
+
+The results are written to a JSON file, together with the git commit and the
+versions of Python and Node.js, so that runs on different commits can be
+compared with ``--compare``.
+
+Usage::
+
+    python benchmarks/suite.py [--scales S ...] [--repeats N] [--node NODE]
+                               [--build-profile PROFILE] [--output FILE]
+                               [--compare BASELINE] [example.py ...]
+
+Needs an activated (or configured) EMSDK and Node.js >= 18.
+"""
+import argparse
+import ast
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+
+from common import BENCHMARK_DIR, build_example, bundled_examples, run_project
+
+#: Names of the variables that are scaled to change the size of a model
+SIZE_VARIABLES = ('N', 'n')
+
+#: Metrics compared with ``--compare``, and whether larger values are better
+COMPARED_METRICS = {('build', 'codegen'): False,
+                    ('build', 'emcc'): False,
+                    ('size', 'wasm_module.wasm'): False,
+                    ('size', 'wasm_module.data'): False,
+                    ('run', 'instantiate'): False,
+                    ('run', 'throughput'): True,
+                    ('run', 'transfer'): False}
+
+
+def scale_source(source, scale):
+    """
+    Scale the size of the model defined by a script.
+
+    Parameters
+    ----------
+    source : str
+        The source code of the script.
+    scale : float
+        The factor for the number of neurons.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    source : str or None
+        The modified source code, or ``None`` if the script does not assign
+        an integer to one of `SIZE_VARIABLES` at the module level.
+    size : int or None
+        The new number of neurons.
+    """
+    for node in ast.parse(source).body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id in SIZE_VARIABLES
+                and isinstance(node.value, ast.Constant)
+                and type(node.value.value) is int):
+            size = max(1, round(node.value.value * scale))
+            lines = source.splitlines(keepends=True)
+            line = lines[node.value.lineno - 1]
+            lines[node.value.lineno - 1] = (line[:node.value.col_offset] + str(size)
+                                            + line[node.value.end_col_offset:])
+            return ''.join(lines), size
+    return None, None
+
+
+def build_measurements(project_dir):
+    """
+    Collect the build time and size measurements of a compiled project.
+
+    Parameters
+    ----------
+    project_dir : str
+        The project directory.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    build : dict
+        The time for generating the code (``"codegen"``), compiling it with
+        ``emcc`` (``"emcc"``, including linking), and for the full build
+        (``"total"``), in seconds.
+    size : dict
+        The size of each downloaded file in bytes, and its compressed size
+        (with the suffix ``" (compressed)"``). Empty if the project has no
+        size report.
+    """
+    with open(os.path.join(project_dir, 'build_timings.json')) as f:
+        timers = json.load(f)
+    phases = timers['build']
+    build = {'codegen': sum(duration for phase, duration in phases.items()
+                            if phase in ('code_objects', 'write_static_arrays')
+                            or phase.startswith('generate_')),
+             'emcc': sum(timers['compile'].get(key) or 0 for key in ('objects', 'make')),
+             'total': sum(phases.values())}
+    size = {}
+    report_file = os.path.join(project_dir, 'size_report.json')
+    # The size report is not written if the module could not be analysed
+    if os.path.exists(report_file):
+        with open(report_file) as f:
+            for name, sizes in json.load(f)['files'].items():
+                size[name] = sizes['size']
+                size[f'{name} (compressed)'] = sizes['compressed']
+    return build, size
+
+
+def run_measurements(project_dir, node='node', repeats=3):
+    """
+    Run a compiled project repeatedly and collect its run time measurements.
+
+    Parameters
+    ----------
+    project_dir : str
+        The project directory.
+    node : str, optional
+        The Node.js executable. Default is ``'node'``.
+    repeats : int, optional
+        The number of runs. Default is 3.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the simulation fails.
+
+    Returns
+    -------
+    dict
+        The best values over all runs for the time for compiling the module
+        (``"compile"``) and for creating its instance (``"instantiate"``),
+        the run time (``"run"``) and the time for copying out the results
+        (``"transfer"``), all in ms, as well as the number of simulated
+        seconds per wall-clock second (``"throughput"``).
+    """
+    runs = [run_project(project_dir, node) for _ in range(repeats)]
+    measurements = {'compile': min(run['compile'] for run in runs)}
+    for phase in ('instantiate', 'run', 'transfer'):
+        measurements[phase] = min(run['timings'][phase] for run in runs)
+    measurements['throughput'] = max(run['simulated'] / (run['timings']['run'] / 1000)
+                                     for run in runs)
+    return measurements
+
+
+def metadata(node='node'):
+    """
+    Describe the environment of a benchmark run.
+
+    Parameters
+    ----------
+    node : str, optional
+        The Node.js executable. Default is ``'node'``.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    dict
+        The current git commit (``None`` outside of a git checkout), the
+        date, and the versions of Python, Node.js, and Brian.
+    """
+    import brian2
+
+    def output(command):
+        try:
+            return subprocess.run(command, cwd=BENCHMARK_DIR, check=True,
+                                  capture_output=True, text=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {'commit': output(['git', 'rev-parse', 'HEAD']),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'node': output([node, '--version']),
+            'brian2': brian2.__version__}
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Print the relative changes of the measurements compared to a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        The results of the current run.
+    baseline : dict
+        The results of an earlier run, in the same format.
+    threshold : float, optional
+        Relative change above which a change is marked as a regression or
+        improvement. Default is 0.1 (10%).
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    None
+        Prints the comparison; does not return a value.
+    """
+    previous = {(entry['example'], entry['scale']): entry for entry in baseline['benchmarks']}
+    print(f"Comparison with commit {baseline['metadata'].get('commit')}:")
+    for entry in results['benchmarks']:
+        old = previous.get((entry['example'], entry['scale']))
+        if old is None:
+            continue
+        for (group, metric), larger_is_better in COMPARED_METRICS.items():
+            value = entry[group].get(metric)
+            old_value = old[group].get(metric)
+            if not value or not old_value:
+                continue
+            change = value / old_value - 1
+            mark = ''
+            if abs(change) > threshold:
+                mark = 'improvement' if (change > 0) == larger_is_better else 'REGRESSION'
+            print(f"  {entry['example']:32s} x{entry['scale']:<5g} {metric:20s} "
+                  f"{change:+8.1%} {mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('examples', nargs='*',
+                        help='Example scripts (default: all bundled examples)')
+    parser.add_argument('--scales', type=float, nargs='+', default=[0.5, 1, 2],
+                        help='Factors for the number of neurons of each example')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Number of runs per build, the best one is reported')
+    parser.add_argument('--node', default='node', help='Node.js executable')
+    parser.add_argument('--build-profile', default='speed', choices=('speed', 'size', 'debug'),
+                        help='Build profile of all builds')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='File for the results (JSON)')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='Results of an earlier run to compare with')
+    args = parser.parse_args()
+    examples = args.examples or bundled_examples()
+    # Compile every build from scratch, so that the emcc times are comparable
+    preferences = {'object_cache': False, 'build_profile': args.build_profile}
+    results = {'metadata': metadata(args.node), 'benchmarks': []}
+    results['metadata']['build_profile'] = args.build_profile
+    print(f"{'example':32s} {'scale':>6s} {'codegen':>8s} {'emcc':>8s} {'wasm':>9s} "
+          f"{'data':>9s} {'inst.':>8s} {'sim s/s':>9s} {'transfer':>9s}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for example in examples:
+            name = os.path.splitext(os.path.basename(example))[0]
+            with open(example) as f:
+                source = f.read()
+            for scale in args.scales:
+                if scale == 1:
+                    scaled_source, size = None, None
+                else:
+                    scaled_source, size = scale_source(source, scale)
+                    if scaled_source is None:
+                        # The size of the model cannot be changed
+                        continue
+                project_dir = build_example(example, os.path.join(tmp_dir, name, f'x{scale:g}'),
+                                            preferences, scaled_source)
+                build, size_measurements = build_measurements(project_dir)
+                run = run_measurements(project_dir, args.node, args.repeats)
+                results['benchmarks'].append({'example': name, 'scale': scale, 'size_variable': size,
+                                              'build': build, 'size': size_measurements,
+                                              'run': run})
+                print(f"{name[:32]:32s} {scale:6g} {build['codegen']:7.2f}s {build['emcc']:7.2f}s "
+                      f"{size_measurements.get('wasm_module.wasm', 0) / 1024:7.1f}kB "
+                      f"{size_measurements.get('wasm_module.data', 0) / 1024:7.1f}kB "
+                      f"{run['instantiate']:6.1f}ms {run['throughput']:9.3f} "
+                      f"{run['transfer']:7.1f}ms")
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -23,6 +23,14 @@ def main():
         If given, generates the WASM/HTML output without starting the
         local preview web server. Internally sets the environment
         variable ``BRIAN2WASM_NO_SERVER=1``.
+    --headless : bool, optional
+        If given, runs the simulation in Node.js instead of a browser, and
+        writes the results to the project's results directory. Internally
+        sets the environment variable ``BRIAN2WASM_HEADLESS=1``.
+    --package : bool, optional
+        If given, packages the project for deployment (content-hashed and
+        precompressed files in the ``dist`` subdirectory of the project).
+        Internally sets the environment variable ``BRIAN2WASM_PACKAGE=1``.
     --skip-install : bool, optional
         If given, skips EMSDK installation and activation checks.
         Use this flag when you are certain EMSDK is already installed
@@ -59,6 +67,16 @@ def main():
         action="store_true",
         help="Generate files without starting the web server"
     )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run the simulation in Node.js instead of a browser"
+    )
+    parser.add_argument(
+        "--package",
+        action="store_true",
+        help="Package the project for deployment in its 'dist' directory"
+    )
     parser.add_argument("--skip-install",
                         action="store_true",
                         help="Run Brian2WASM without installing/activating EMSDK"
@@ -119,6 +137,10 @@ def main():
     try:
         if args.no_server:
             os.environ['BRIAN2WASM_NO_SERVER'] = '1'
+        if args.headless:
+            os.environ['BRIAN2WASM_HEADLESS'] = '1'
+        if args.package:
+            os.environ['BRIAN2WASM_PACKAGE'] = '1'
 
         print(f"Script path: {os.path.abspath(script_path)}")
         print(f"Directory: {script_dir}")
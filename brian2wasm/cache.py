@@ -0,0 +1,297 @@
+"""
+Content-addressed cache for object files compiled with ``emcc``.
+
+Object files are stored under a key that combines the hash of the source file
+(including all headers it includes with ``#include "..."``), the Emscripten
+version, and the compilation flags. Projects that are built in different
+directories, or rebuilt from scratch, can therefore reuse object files that
+have been compiled before.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from brian2.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+
+
+def default_cache_directory():
+    """
+    Return the default directory for cached object files.
+
+    Uses ``$XDG_CACHE_HOME/brian2wasm/objects`` if the ``XDG_CACHE_HOME``
+    environment variable is set, and ``~/.cache/brian2wasm/objects`` otherwise.
+
+    Parameters
+    ----------
+    None
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    str
+        The absolute path of the cache directory (not necessarily existing).
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'brian2wasm', 'objects')
+
+
+def emcc_version(emsdk_path=None):
+    """
+    Determine the version of the Emscripten compiler.
+
+    The version is read from the ``emscripten-version.txt`` file of the
+    Emscripten installation if possible, to avoid the cost of running
+    ``emcc --version``.
+
+    Parameters
+    ----------
+    emsdk_path : str, optional
+        Path of the *emsdk* installation. If not given, the ``emcc`` executable
+        on the ``PATH`` is used.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    str or None
+        The version string, or ``None`` if the version could not be determined.
+    """
+    candidates = []
+    if emsdk_path:
+        candidates.append(os.path.join(emsdk_path, 'upstream', 'emscripten'))
+    emcc = shutil.which('emcc')
+    if emcc:
+        candidates.append(os.path.dirname(os.path.realpath(emcc)))
+    for directory in candidates:
+        version_file = os.path.join(directory, 'emscripten-version.txt')
+        if os.path.exists(version_file):
+            with open(version_file) as f:
+                return f.read().strip().strip('"')
+    if emcc:
+        try:
+            output = subprocess.run([emcc, '--version'], capture_output=True,
+                                    text=True, check=True).stdout
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return output.splitlines()[0] if output else None
+    return None
+
+
+def source_hash(filename, include_dirs=()):
+    """
+    Hash a source file together with all the headers it includes.
+
+    Headers included with ``#include "..."`` are searched for in the
+    directory of the including file and in ``include_dirs``, and are hashed
+    recursively. Headers that cannot be found (e.g. system headers) are
+    ignored; they are covered by the compiler version.
+
+    Parameters
+    ----------
+    filename : str
+        The source file.
+    include_dirs : sequence of str, optional
+        Additional directories to search for included headers.
+
+    Raises
+    ------
+    OSError
+        If ``filename`` cannot be read.
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 hash.
+    """
+    hasher = hashlib.sha256()
+    seen = set()
+    to_visit = [os.path.abspath(filename)]
+    while to_visit:
+        current = to_visit.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        with open(current, 'rb') as f:
+            content = f.read()
+        # Only the content matters, not where the project directory is
+        hasher.update(hashlib.sha256(content).digest())
+        search_dirs = [os.path.dirname(current)] + list(include_dirs)
+        for include in _INCLUDE_RE.findall(content.decode('utf-8', errors='replace')):
+            for directory in search_dirs:
+                candidate = os.path.abspath(os.path.join(directory, include))
+                if os.path.isfile(candidate):
+                    to_visit.append(candidate)
+                    break
+    return hasher.hexdigest()
+
+
+class ObjectCache:
+    """
+    Content-addressed storage for compiled object files.
+
+    Parameters
+    ----------
+    directory : str
+        The directory where cached object files are stored.
+    compiler_version : str
+        The version of the compiler, part of every key.
+    compile_flags : str
+        The flags used for compilation, part of every key.
+    """
+
+    def __init__(self, directory, compiler_version, compile_flags):
+        self.directory = directory
+        self.compiler_version = compiler_version
+        self.compile_flags = compile_flags
+
+    def key(self, source_file, include_dirs=()):
+        """
+        Compute the cache key for a source file.
+
+        Parameters
+        ----------
+        source_file : str
+            The source file to compile.
+        include_dirs : sequence of str, optional
+            Additional directories to search for included headers.
+
+        Raises
+        ------
+        OSError
+            If the source file cannot be read.
+
+        Returns
+        -------
+        str
+            The hexadecimal cache key.
+        """
+        hasher = hashlib.sha256()
+        hasher.update(self.compiler_version.encode())
+        hasher.update(b'\0')
+        hasher.update(self.compile_flags.encode())
+        hasher.update(b'\0')
+        hasher.update(source_hash(source_file, include_dirs).encode())
+        return hasher.hexdigest()
+
+    def _path(self, key, suffix='.o'):
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def restore(self, key, object_file):
+        """
+        Copy a cached object file to its destination.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `key`.
+        object_file : str
+            The destination of the object file.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        bool
+            Whether the object file was found in the cache.
+        """
+        cached = self._path(key)
+        if not os.path.exists(cached):
+            return False
+        try:
+            shutil.copyfile(cached, object_file)
+        except OSError as ex:
+            logger.debug(f"Could not restore '{object_file}' from the cache: {ex}")
+            return False
+        return True
+
+    def restore_info(self, key):
+        """
+        Return the information stored together with a cached object file.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `key`.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        dict or None
+            The information passed to `store`, or ``None`` if there is none
+            (e.g. for entries stored without information).
+        """
+        try:
+            with open(self._path(key, '.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, object_file, info=None):
+        """
+        Store an object file in the cache.
+
+        The file is first copied to a temporary file and then renamed, so that
+        concurrent builds never see incomplete files.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `key`.
+        object_file : str
+            The object file to store.
+        info : dict, optional
+            Additional information about the compilation (e.g. the number of
+            vectorized loops), returned by `restore_info`. It is also added
+            to an existing entry that has no information yet.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Copies the file into the cache; does not return a value.
+        """
+        cached = self._path(key)
+        if not os.path.exists(cached):
+            with open(object_file, 'rb') as f:
+                self._write(cached, f, object_file)
+        if info is not None and not os.path.exists(self._path(key, '.json')):
+            self._write(self._path(key, '.json'), json.dumps(info).encode('utf-8'), object_file)
+
+    def _write(self, cached, content, object_file):
+        # Write via a temporary file and rename it, content is either a file
+        # object or bytes
+        tmp_name = None
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(cached), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp:
+                if isinstance(content, bytes):
+                    tmp.write(content)
+                else:
+                    shutil.copyfileobj(content, tmp)
+            os.replace(tmp_name, cached)
+        except OSError as ex:
+            logger.debug(f"Could not store '{object_file}' in the cache: {ex}")
+            if tmp_name is not None and os.path.exists(tmp_name):
+                os.remove(tmp_name)
@@ -0,0 +1,197 @@
+"""
+Packaging of compiled projects for deployment on a web server.
+
+A packaged project contains only the files that the browser needs. All files
+except ``index.html`` get content-hashed names (e.g.
+``wasm_module.3f2a9c0e1b.wasm``), so that web servers can let browsers cache
+them indefinitely, and are stored in precompressed versions (``.gz``, and
+``.br`` if the `brotli` package is installed) next to the original files.
+``brian2wasm.server`` serves these versions with the correct
+``Content-Encoding`` header.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from brian2.utils.logger import get_logger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = get_logger(__name__)
+
+#: Files loaded by the worker, referenced via ``brian_config.asset_urls``
+WORKER_ASSETS = ('wasm_module.wasm', 'wasm_module.js', 'wasm_module.data')
+
+#: Extensions of files that are already compressed
+COMPRESSED_EXTENSIONS = ('.gz', '.br', '.z', '.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+_CONFIG_RE = re.compile(r'^\s*var\s+brian_config\s*=\s*(.*);\s*$', re.DOTALL)
+
+
+def hashed_name(name, content, length=10):
+    """
+    Add the hash of a file's content to its name.
+
+    Parameters
+    ----------
+    name : str
+        The file name (can include a directory).
+    content : bytes
+        The content of the file.
+    length : int, optional
+        The number of hexadecimal digits of the hash. Default is 10.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    str
+        The name with the hash inserted before the extension, e.g.
+        ``"wasm_module.3f2a9c0e1b.wasm"``.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:length]
+    base, ext = os.path.splitext(name)
+    return f'{base}.{digest}{ext}'
+
+
+def _replace_reference(text, name, new_name):
+    # Only replace quoted references, optionally starting with "./"
+    pattern = re.compile(r'(["\'])(\./)?' + re.escape(name) + r'\1')
+    return pattern.sub(lambda match: f'{match.group(1)}{match.group(2) or ""}{new_name}{match.group(1)}',
+                       text)
+
+
+def compress_file(filename, encodings=('gzip', 'br')):
+    """
+    Write precompressed versions of a file.
+
+    Versions that are not smaller than the original file are not written.
+
+    Parameters
+    ----------
+    filename : str
+        The file to compress.
+    encodings : iterable of str, optional
+        The encodings, ``"gzip"`` (written to ``filename + ".gz"``) and/or
+        ``"br"`` (written to ``filename + ".br"``, only if the `brotli`
+        package is installed). Default is both.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list of str
+        The encodings that have been written.
+    """
+    with open(filename, 'rb') as f:
+        content = f.read()
+    written = []
+    for encoding in encodings:
+        if encoding == 'gzip':
+            # mtime=0 makes the output reproducible
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            extension = '.gz'
+        elif encoding == 'br' and brotli is not None:
+            compressed = brotli.compress(content)
+            extension = '.br'
+        else:
+            continue
+        if len(compressed) < len(content):
+            with open(filename + extension, 'wb') as f:
+                f.write(compressed)
+            written.append(encoding)
+    return written
+
+
+def package(directory, output_directory=None, encodings=('gzip', 'br')):
+    """
+    Package a compiled project for deployment.
+
+    Copies ``index.html`` and all files needed by the simulation to the output
+    directory, renames all files except ``index.html`` to content-hashed
+    names, updates the references between the files, and writes precompressed
+    versions of all files.
+
+    Parameters
+    ----------
+    directory : str
+        The project directory, with a compiled project and its ``index.html``.
+    output_directory : str, optional
+        The directory for the packaged files. Its previous content is
+        deleted. Default is the ``dist`` subdirectory of the project
+        directory.
+    encodings : iterable of str, optional
+        The encodings of the precompressed files, see `compress_file`.
+        Default is ``('gzip', 'br')``.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the project has not been compiled, or ``index.html`` is missing.
+
+    Returns
+    -------
+    str
+        The output directory.
+    """
+    if output_directory is None:
+        output_directory = os.path.join(directory, 'dist')
+    for required in ('index.html', 'wasm_module.js', 'wasm_module.wasm', 'brian_config.js'):
+        if not os.path.exists(os.path.join(directory, required)):
+            raise FileNotFoundError(f"Cannot package '{directory}': '{required}' does not exist.")
+    if os.path.exists(output_directory):
+        shutil.rmtree(output_directory)
+    os.makedirs(output_directory)
+
+    def write(name, content):
+        filename = os.path.join(output_directory, name)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'wb') as f:
+            f.write(content)
+
+    def read(name):
+        with open(os.path.join(directory, name), 'rb') as f:
+            return f.read()
+
+    def write_hashed(name, content):
+        new_name = hashed_name(name, content)
+        write(new_name, content)
+        return new_name
+
+    match = _CONFIG_RE.match(read('brian_config.js').decode('utf-8'))
+    config = json.loads(match.group(1))
+    # The worker loads these files via brian_config.asset_urls, and writes
+    # static arrays to the simulation's file system under their original name
+    asset_urls = {}
+    for name in WORKER_ASSETS + tuple(config['static_arrays']):
+        if os.path.exists(os.path.join(directory, name)):
+            asset_urls[name] = write_hashed(name, read(name))
+    config['asset_urls'] = asset_urls
+    config_name = write_hashed('brian_config.js',
+                               f'var brian_config = {json.dumps(config, indent=4)};\n'.encode('utf-8'))
+
+    # The remaining references are rewritten in the files themselves
+    worker = _replace_reference(read('worker.js').decode('utf-8'), 'brian_config.js', config_name)
+    worker_name = write_hashed('worker.js', worker.encode('utf-8'))
+    brian = _replace_reference(read('brian.js').decode('utf-8'), 'worker.js', worker_name)
+    brian_name = write_hashed('brian.js', brian.encode('utf-8'))
+    html = _replace_reference(read('index.html').decode('utf-8'), 'brian.js', brian_name)
+    write('index.html', html.encode('utf-8'))
+
+    for root, _, files in os.walk(output_directory):
+        for name in files:
+            if not name.endswith(COMPRESSED_EXTENSIONS):
+                compress_file(os.path.join(root, name), encodings)
+    if 'br' in encodings and brotli is None:
+        logger.info("Install the 'brotli' package to create Brotli-compressed files.", once=True)
+    return output_directory
@@ -1,25 +1,40 @@
 """
 Module implementing the WASM/JS "standalone" device.
 """
+import contextlib
+import hashlib
+import json
 import os
-import platform
 import re
+import shlex
 import shutil
+import subprocess
+import sys
 import tempfile
 import time
+import zlib
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
-from brian2.units import second
+from brian2.units import second, ms
 from brian2.core.namespace import get_local_namespace
 from brian2.core.preferences import prefs, BrianPreference
+from brian2.core.network import Network
 from brian2.synapses import Synapses
+from brian2.monitors import EventMonitor, PopulationRateMonitor, StateMonitor
 from brian2.utils.logger import get_logger
 from brian2.utils.filetools import in_directory
 from brian2.devices import all_devices
 from brian2.devices.cpp_standalone.device import CPPStandaloneDevice, CPPWriter
 from brian2.utils.filetools import ensure_directory
+from brian2.utils.logger import std_silent
+
+from .cache import ObjectCache, default_cache_directory, emcc_version
+from .deploy import package
+from .server import serve, serve_in_background
+from .size_report import format_size_report, size_report
 
 
 logger = get_logger(__name__)
@@ -57,9 +72,329 @@ prefs.register_preferences(
             Example: ``["-sEXPORT_ES6", "-sEXPORTED_RUNTIME_METHODS=['cwrap']"]``.
             """,
     ),
+    result_2d_layout=BrianPreference(
+        default="per_neuron",
+        docs="""
+            Layout of 2d results (e.g. ``StateMonitor`` recordings) in JavaScript.
+            With ``"per_neuron"``, each variable is a list with one typed array
+            per recorded neuron; all these arrays are views on a single buffer.
+            With ``"flat"``, each variable is an object ``{data, shape, strides}``
+            where ``data`` is a single typed array in Brian's native layout, i.e.
+            with ``shape = [n_timesteps, n_neurons]``.
+            """,
+        validator=lambda v: v in ("per_neuron", "flat"),
+    ),
+    spike_stream_interval=BrianPreference(
+        default=2*ms,
+        docs="""
+            Simulated time covered by each chunk of spikes sent by
+            `~brian2wasm.functions.stream_spike`. Set to ``0*ms`` to only use
+            *spike_stream_wallclock_interval*.
+            """,
+    ),
+    spike_stream_wallclock_interval=BrianPreference(
+        default=0.0,
+        docs="""
+            Maximum wall-clock time (in ms) between two chunks of spikes sent by
+            `~brian2wasm.functions.stream_spike`. Set to ``0`` (the default) to
+            only use *spike_stream_interval*.
+            """,
+    ),
+    openmp_runtime_directory=BrianPreference(
+        default="",
+        docs="""
+            Directory with a WebAssembly build of LLVM's OpenMP runtime
+            (``include/omp.h`` and ``lib/libomp.a``), needed for multithreaded
+            builds with ``devices.cpp_standalone.openmp_threads > 0``, since the
+            *emsdk* does not provide one.
+            """,
+    ),
+    compress_static_arrays=BrianPreference(
+        default=False,
+        docs="""
+            Whether to compress static arrays (e.g. explicit connectivity or
+            ``TimedArray`` values) with zlib at build time. They are decompressed
+            by the WebAssembly code, so that only the compressed data has to be
+            downloaded. Uses Emscripten's zlib port.
+            """,
+    ),
+    static_array_loading=BrianPreference(
+        default="preload",
+        docs="""
+            How static arrays are delivered to the simulation: ``"preload"``
+            bundles them in the ``wasm_module.data`` file that Emscripten
+            downloads before the simulation starts; ``"fetch"`` downloads them as
+            individual files, in parallel and while the WebAssembly module is
+            being compiled, and keeps them in memory for later runs.
+            """,
+        validator=lambda v: v in ("preload", "fetch"),
+    ),
+    browser_cache=BrianPreference(
+        default=False,
+        docs="""
+            Whether the web worker stores ``wasm_module.wasm`` in the browser's
+            Cache Storage, keyed by a hash of the compiled code. Returning
+            visitors then compile the module from the cache instead of
+            downloading it again; a new build has a new hash and replaces the
+            cached code.
+            """,
+    ),
+    package=BrianPreference(
+        default=False,
+        docs="""
+            Whether to package the project for deployment after building it
+            (see `brian2wasm.deploy.package`): the files needed by the browser
+            are copied to the ``dist`` subdirectory of the project, with
+            content-hashed names and precompressed versions. The simulation is
+            then previewed from this directory, with ``brian2wasm.server``.
+            """,
+    ),
+    print_build_timings=BrianPreference(
+        default=False,
+        docs="""
+            Whether to print a summary of the time spent in each phase of
+            ``device.build`` (code generation, compilation, linking, ...). The
+            timings are always stored in the device's ``timers`` attribute and
+            in the ``build_timings.json`` file in the project directory.
+            """,
+    ),
+    background_server=BrianPreference(
+        default=False,
+        docs="""
+            Whether the web server for the browser preview runs in a background
+            thread. ``device.build`` then returns as soon as the page has been
+            opened, and the server keeps running until the Python process ends.
+            Several projects built in the same process are served by the same
+            server, under the names of their directories. This is only useful
+            in interactive sessions (e.g. IPython or Jupyter notebooks): when a
+            script ends, the process and with it the server stop before the
+            page has been loaded, so for scripts that are not run
+            interactively, the preference is ignored (with a warning). By
+            default, the server runs until it is interrupted with Ctrl+C.
+            """,
+    ),
+    run_target=BrianPreference(
+        default="browser",
+        docs="""
+            Where ``device.build`` runs the simulation: ``"browser"`` opens it in
+            a web browser, served by ``brian2wasm.server``; ``"node"`` runs it
+            headless in Node.js
+            and writes the results back to the project's results directory, so
+            that they can be accessed from Python.
+            """,
+        validator=lambda v: v in ("browser", "node"),
+    ),
+    node_executable=BrianPreference(
+        default="node",
+        docs="""
+            The Node.js executable used for ``run_target = "node"``.
+            """,
+    ),
+    simd=BrianPreference(
+        default=False,
+        docs="""
+            Whether to compile with 128-bit WebAssembly SIMD instructions
+            (``-msimd128``), so that loops over neurons and synapses can be
+            auto-vectorized. Supported by all current browsers. Which loops
+            have been vectorized is stored in the device's
+            ``vectorization_report``. The counts are kept with object files
+            that are reused (see *object_cache*); object files compiled
+            without SIMD reporting are compiled again.
+            """,
+    ),
+    build_profile=BrianPreference(
+        default="speed",
+        docs="""
+            Trade-off between simulation speed, download size, and debugging
+            support: ``"speed"`` optimises for speed (``-O3``); ``"size"``
+            optimises for code size (``-Oz``, link-time optimisation, a smaller
+            memory allocator, and pre-evaluation of static constructors by
+            ``wasm-opt``); ``"debug"`` compiles without optimisations but with
+            debug information, runtime assertions, and memory access checks.
+            """,
+        validator=lambda v: v in ("speed", "size", "debug"),
+    ),
+    random_generator=BrianPreference(
+        default="mt19937",
+        docs="""
+            The random number generator of the simulation: ``"mt19937"`` uses
+            the Mersenne Twister of Brian's C++ standalone mode, i.e. the same
+            random numbers for the same seed; ``"xoshiro"`` uses xoshiro256+
+            generators that create uniform and normal random numbers in
+            batches, which is considerably faster for models with noise (e.g.
+            ``xi`` terms in the equations).
+            """,
+        validator=lambda v: v in ("mt19937", "xoshiro"),
+    ),
+    compile_jobs=BrianPreference(
+        default=None,
+        docs="""
+            Number of source files that are compiled in parallel by *emcc*.
+            Defaults to ``None``, i.e. the number of CPUs of the machine
+            running the build.
+            """,
+        validator=lambda v: v is None or (isinstance(v, int) and not isinstance(v, bool) and v > 0),
+    ),
+    object_cache=BrianPreference(
+        default=True,
+        docs="""
+            Whether to reuse object files compiled by *emcc* across projects and
+            rebuilds. Object files are cached under a key combining the hash of
+            the source file and its headers, the Emscripten version, and the
+            compilation flags. Not used on Windows.
+            """,
+    ),
+    object_cache_directory=BrianPreference(
+        default="",
+        docs="""
+            Directory for the object file cache. Leave empty to use
+            ``$XDG_CACHE_HOME/brian2wasm/objects`` (``~/.cache/brian2wasm/objects``
+            if ``XDG_CACHE_HOME`` is not set).
+            """,
+    ),
 )
 
 
+# Flags for the build_profile preference: optimisation flags (used for
+# compiling and linking) and additional flags for linking
+BUILD_PROFILES = {
+    'speed': ('-O3 -ffast-math -fno-finite-math-only', ''),
+    'size': ('-Oz -flto -ffast-math -fno-finite-math-only', '-sMALLOC=emmalloc -sEVAL_CTORS=1'),
+    'debug': ('-O0 -g', '-sASSERTIONS=2 -sSAFE_HEAP=1 -sSTACK_OVERFLOW_CHECK=2 -sVERBOSE=1'),
+}
+
+# Compiler arguments to report which loops have been auto-vectorized
+VECTORIZATION_REMARK_ARGS = ['-Rpass=loop-vectorize', '-Rpass-missed=loop-vectorize']
+# Templates with the per-neuron loops that should be vectorized
+VECTORIZED_TEMPLATES = ('stateupdate', 'threshold', 'reset')
+
+_emsdk_environments = {}
+
+
+def _interactive_session():
+    """
+    Determine whether Python runs interactively.
+
+    Parameters
+    ----------
+    None
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    bool
+        Whether Python runs in an interactive interpreter (including
+        ``python -i``), or in IPython or a Jupyter kernel.
+    """
+    if hasattr(sys, 'ps1') or sys.flags.interactive:
+        return True
+    ipython = sys.modules.get('IPython')
+    return ipython is not None and ipython.get_ipython() is not None
+
+
+def _emsdk_environment(emsdk_path, emsdk_version):
+    """
+    Return the environment variables of an activated *emsdk*.
+
+    The environment is determined once per *emsdk* installation and version
+    (in the same way as in the generated makefile) and then reused.
+
+    Parameters
+    ----------
+    emsdk_path : str
+        Path of the *emsdk* installation. If empty, the *emsdk* is assumed to
+        be activated in the current environment.
+    emsdk_version : str
+        Version passed to ``emsdk activate``.
+
+    Raises
+    ------
+    RuntimeError
+        If the *emsdk* cannot be activated.
+
+    Returns
+    -------
+    dict
+        The environment variables.
+    """
+    if not emsdk_path:
+        return dict(os.environ)
+    if (emsdk_path, emsdk_version) not in _emsdk_environments:
+        result = subprocess.run(['bash', '-c',
+                                 f'"{emsdk_path}/emsdk" activate {emsdk_version} >/dev/null && '
+                                 f'source "{emsdk_path}/emsdk_env.sh" >/dev/null 2>&1; env -0'],
+                                capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Could not activate the emsdk in '{emsdk_path}': "
+                               f"{result.stderr.decode(errors='replace')}")
+        env = dict(entry.split('=', 1) for entry in
+                   result.stdout.decode(errors='replace').split('\0') if '=' in entry)
+        _emsdk_environments[(emsdk_path, emsdk_version)] = env
+    return dict(_emsdk_environments[(emsdk_path, emsdk_version)])
+
+
+def _vectorization_file(object_file):
+    return object_file[:-len('.o')] + '.vectorization.json'
+
+
+def _read_vectorization_counts(object_file):
+    """
+    Read the vectorization counts stored when an object file was compiled.
+
+    Parameters
+    ----------
+    object_file : str
+        The object file.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    dict or None
+        The number of vectorized and non-vectorized loops, or ``None`` if
+        the object file was compiled without optimisation remarks.
+    """
+    filename = _vectorization_file(object_file)
+    # A counts file older than the object file belongs to an earlier compilation
+    if (not os.path.exists(filename)
+            or os.path.getmtime(filename) < os.path.getmtime(object_file)):
+        return None
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_vectorization_counts(object_file, counts):
+    """
+    Store the vectorization counts of an object file next to it.
+
+    Parameters
+    ----------
+    object_file : str
+        The object file.
+    counts : dict
+        The number of vectorized and non-vectorized loops.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    None
+        Writes the file to disk; does not return a value.
+    """
+    with open(_vectorization_file(object_file), 'w') as f:
+        json.dump(counts, f)
+
+
 DEFAULT_HTML_CONTENT = {'title': 'Brian simulation',
                         'h1': '',
                         'h2': '',
@@ -95,7 +430,29 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
             Initializes internal state; does not return a value.
         """
         self.transfer_results = None
+        #: Dictionary mapping monitor names to ``(period, truncate)`` tuples
+        #: for monitors that send their data to JavaScript during the run
+        self.streamed_monitors = {}
+        #: Number of vectorized and non-vectorized loops for each compiled
+        #: source file (only filled for builds with the ``simd`` preference)
+        self.vectorization_report = {}
+        #: Memory-mapped result files, mapping variables to tuples
+        #: ``(modification time, array)``, see `get_value`
+        self.result_cache = {}
+        #: Hash of the compiled ``wasm_module.wasm`` (``None`` before the
+        #: project has been compiled), see `compute_build_hash`
+        self.build_hash = None
+        #: Sizes of the generated files, sections, code objects, and functions
+        #: of the last build, see `write_size_report`
+        self.size_report = None
+        #: Time, number of calls, and share of the total time for each code
+        #: object, for headless runs with ``profile=True`` (see `run_headless`)
+        self.profiling_info = None
         super(WASMStandaloneDevice, self).__init__(*args, **kwds)
+        self.timers["compile"].update({"objects": None, "files": {}, "emsdk_activation": None,
+                                       "cache": None})
+        #: Time spent in each phase of the build, see `_timed`
+        self.timers["build"] = {}
 
     def transfer_only(self, variableviews):
         """
@@ -124,6 +481,133 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         for variableview in variableviews:
             self.transfer_results.append(variableview.variable)
 
+    def stream_monitor(self, monitor, period=10*ms, truncate=False):
+        """
+        Send the data recorded by a monitor to JavaScript during the run.
+
+        Every ``period``, the values that the monitor recorded since the last
+        delivery are sent to JavaScript as a ``{type: 'monitor', owner, start,
+        data}`` message, which is handed to the ``onMonitorData`` method of
+        ``BrianSimulation``. The remaining values are sent at the end of the
+        simulation.
+
+        Parameters
+        ----------
+        monitor : SpikeMonitor, EventMonitor, PopulationRateMonitor or StateMonitor
+            The monitor whose data should be streamed. Has to be called before
+            the ``run`` call that creates the monitor's code.
+        period : Quantity, optional
+            Simulated time between two deliveries. Default is 10ms.
+        truncate : bool, optional
+            Whether to delete the recorded values from the monitor once they
+            have been delivered, so that the memory use stays bounded during
+            long runs. The final results will then only contain the values
+            of the last delivery, which is made at the end of the simulation.
+            Default is False.
+
+        Raises
+        ------
+        TypeError
+            If ``monitor`` is not a supported monitor type.
+
+        Returns
+        -------
+        None
+            Stores the streaming settings for code generation; does not return a value.
+        """
+        if not isinstance(monitor, (EventMonitor, PopulationRateMonitor, StateMonitor)):
+            raise TypeError("Only SpikeMonitor, EventMonitor, PopulationRateMonitor "
+                            f"and StateMonitor objects can be streamed, not '{type(monitor)}'.")
+        self.streamed_monitors[monitor.name] = (period, truncate)
+
+    def code_object(self, owner, name, abstract_code, variables, template_name,
+                    variable_indices, codeobj_class=None, template_kwds=None,
+                    override_conditional_write=None, compiler_kwds=None):
+        """
+        Create a code object, adding the streaming settings for monitors.
+
+        For monitors registered with `stream_monitor`, the number of time steps
+        between deliveries and the truncation setting are passed on to the
+        monitor templates. Everything else is handled by the parent
+        ``CPPStandaloneDevice``.
+
+        Parameters
+        ----------
+        owner : Group
+            The object that owns the code object.
+        name : str
+            Name of the code object.
+        abstract_code : dict
+            The abstract code for each code block.
+        variables : dict
+            The variables used by the code.
+        template_name : str
+            Name of the template used for code generation.
+        variable_indices : dict
+            The index variables for each variable.
+        codeobj_class : type, optional
+            The code object class to use.
+        template_kwds : dict, optional
+            Additional arguments for the template.
+        override_conditional_write : set, optional
+            Variables for which conditional writes should not be used.
+        compiler_kwds : dict, optional
+            Additional arguments for the compiler.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        CodeObject
+            The created code object.
+        """
+        if (template_name in ('spikemonitor', 'ratemonitor', 'statemonitor')
+                and getattr(owner, 'name', None) in self.streamed_monitors):
+            period, truncate = self.streamed_monitors[owner.name]
+            template_kwds = dict(template_kwds) if template_kwds else {}
+            template_kwds['stream_steps'] = max(1, int(round(float(period / owner.clock.dt))))
+            template_kwds['stream_truncate'] = truncate
+            template_kwds['result_2d_layout'] = prefs.devices.wasm_standalone.result_2d_layout
+        # Code objects are generated during the run call(s), before the build
+        with self._timed('code_objects'):
+            return super(WASMStandaloneDevice, self).code_object(
+                owner, name, abstract_code, variables, template_name, variable_indices,
+                codeobj_class=codeobj_class, template_kwds=template_kwds,
+                override_conditional_write=override_conditional_write,
+                compiler_kwds=compiler_kwds)
+
+    @contextlib.contextmanager
+    def _timed(self, phase):
+        """
+        Measure the time spent in a phase of the build.
+
+        The time is added to ``self.timers["build"][phase]``, so that phases
+        that are entered several times (e.g. the generation of code objects)
+        are summed up.
+
+        Parameters
+        ----------
+        phase : str
+            The name of the phase.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        contextmanager
+            Context manager measuring the time spent in its block.
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            timers = self.timers["build"]
+            timers[phase] = timers.get(phase, 0.0) + time.time() - start_time
+
     def activate(self, *args, **kwargs):
         """
         Activate the WASM standalone device for simulation.
@@ -211,6 +695,11 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
             code_objects=list(self.code_objects.values()),
             timed_arrays=timed_arrays,
             transfer_results=self.transfer_results,
+            result_2d_layout=prefs.devices.wasm_standalone.result_2d_layout,
+            compress_static_arrays=prefs.devices.wasm_standalone.compress_static_arrays,
+            spike_stream_interval=float(prefs.devices.wasm_standalone.spike_stream_interval),
+            spike_stream_wallclock_interval=float(prefs.devices.wasm_standalone.spike_stream_wallclock_interval),
+            random_generator=prefs.devices.wasm_standalone.random_generator,
         )
         writer.write("objects.*", arr_tmp)
 
@@ -232,7 +721,9 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         linker_flags : str
             Linker flags to apply.
         nb_threads : int
-            Number of threads (unused for WASM).
+            Number of threads. If larger than zero, the code is compiled with
+            pthread support and linked to the OpenMP runtime in the
+            ``openmp_runtime_directory`` preference.
         debug : bool
             Whether to include debug symbols.
 
@@ -246,8 +737,14 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         None
             Writes the makefile to disk; does not return a value.
         """
-        preloads = ' '.join(f'--preload-file static_arrays/{static_array}'
-                            for static_array in sorted(self.static_arrays.keys()))
+        if prefs.devices.wasm_standalone.static_array_loading == 'preload':
+            preloads = ' '.join(f'--preload-file {static_array_file}'
+                                for static_array_file in self.static_array_files())
+        else:
+            preloads = ''
+        if prefs.devices.wasm_standalone.compress_static_arrays:
+            # Part of OPTIMISATIONS, i.e. used for compiling and linking
+            compiler_flags += ' -sUSE_ZLIB=1'
         rm_cmd = 'rm $(OBJS) $(PROGRAM) $(DEPS)'
         if debug:
             compiler_debug_flags = '-g -DDEBUG'
@@ -259,6 +756,23 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         source_files = ' '.join(sorted(writer.source_files))
         preamble_file = os.path.join(os.path.dirname(__file__), 'templates', 'pre.js')
 
+        if nb_threads > 0:
+            # Threads are WebAssembly pthreads (workers sharing the memory via a
+            # SharedArrayBuffer). The pool is created before the simulation
+            # starts, since the blocking simulation loop cannot wait for new
+            # workers to start up.
+            openmp_dir = prefs.devices.wasm_standalone.openmp_runtime_directory
+            thread_compile_flags = f'-pthread -I{os.path.join(openmp_dir, "include")}'
+            thread_link_flags = (f'-pthread -sPTHREAD_POOL_SIZE={int(nb_threads)} '
+                                 f'-L{os.path.join(openmp_dir, "lib")} -lomp')
+        else:
+            thread_compile_flags = ''
+            thread_link_flags = ''
+        if prefs.devices.wasm_standalone.simd:
+            # Part of OPTIMISATIONS, i.e. used for compiling and linking
+            compiler_flags += ' -msimd128'
+        optimisation_flags, profile_link_flags = BUILD_PROFILES[prefs.devices.wasm_standalone.build_profile]
+
         prefs.devices.wasm_standalone.emsdk_directory = (
                 prefs.devices.wasm_standalone.emsdk_directory
                 or os.environ.get("EMSDK")
@@ -283,7 +797,11 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
                 preamble_file=preamble_file,
                 rm_cmd=rm_cmd,
                 emsdk_path=emsdk_path,
-                emsdk_version=emsdk_version)
+                emsdk_version=emsdk_version,
+                thread_compile_flags=thread_compile_flags,
+                thread_link_flags=thread_link_flags,
+                optimisation_flags=optimisation_flags,
+                profile_link_flags=profile_link_flags)
         else:
             makefile_tmp = self.code_object_class().templater.makefile(None, None,
                 source_files=source_files,
@@ -296,9 +814,493 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
                 preamble_file=preamble_file,
                 rm_cmd=rm_cmd,
                 emsdk_path=emsdk_path,
-                emsdk_version=emsdk_version)
+                emsdk_version=emsdk_version,
+                thread_compile_flags=thread_compile_flags,
+                thread_link_flags=thread_link_flags,
+                optimisation_flags=optimisation_flags,
+                profile_link_flags=profile_link_flags)
         outputfile_name = 'win_makefile' if os.name == 'nt' else 'makefile'
         writer.write(outputfile_name, makefile_tmp)
+        # All flags that influence the compilation of an object file, as used
+        # in the makefile (part of the key for the object cache)
+        makefile_vars = dict(line.split('=', 1) for line in makefile_tmp.splitlines()
+                             if line.startswith(('OPTIMISATIONS', 'CXXFLAGS')))
+        makefile_vars = {name.strip(): value.strip() for name, value in makefile_vars.items()}
+        self.object_compile_flags = '\n'.join(f'{name} = {value}'
+                                               for name, value in sorted(makefile_vars.items()))
+        self.object_compile_args = shlex.split(
+            makefile_vars.get('CXXFLAGS', '').replace('$(OPTIMISATIONS)',
+                                                      makefile_vars.get('OPTIMISATIONS', '')))
+
+    def check_openmp_compatible(self, nb_threads):
+        """
+        Check that a multithreaded build is possible.
+
+        Emscripten implements threads as pthreads running in web workers, but
+        the *emsdk* does not include an OpenMP runtime. Multithreaded builds
+        therefore need a WebAssembly build of LLVM's OpenMP runtime (``libomp``),
+        set with the ``openmp_runtime_directory`` preference.
+
+        Parameters
+        ----------
+        nb_threads : int
+            The number of threads (``devices.cpp_standalone.openmp_threads``).
+
+        Raises
+        ------
+        ValueError
+            If ``nb_threads`` is larger than zero and no OpenMP runtime is set.
+
+        Returns
+        -------
+        None
+            Checks the configuration; does not return a value.
+        """
+        super(WASMStandaloneDevice, self).check_openmp_compatible(nb_threads)
+        if nb_threads > 0 and not prefs.devices.wasm_standalone.openmp_runtime_directory:
+            raise ValueError("Multithreaded builds (devices.cpp_standalone.openmp_threads > 0) "
+                             "need a WebAssembly build of the OpenMP runtime, please set the "
+                             "devices.wasm_standalone.openmp_runtime_directory preference to "
+                             "a directory with 'include/omp.h' and 'lib/libomp.a'.")
+
+    def compile_source(self, directory, compiler, debug, clean):
+        """
+        Compile the project with ``emcc``.
+
+        Source files are compiled to object files in parallel by a pool of
+        ``compile_jobs`` threads (see the ``devices.wasm_standalone``
+        preferences), and ``make`` then links the final module. Before
+        compiling, object files that have been compiled before from the same
+        sources with the same compiler version and flags are copied from the
+        object cache (see the ``object_cache`` preference); newly compiled
+        object files are added to the cache. The compilation time of each file
+        is stored in ``self.timers['compile']['files']``.
+
+        Parameters
+        ----------
+        directory : str
+            The project directory.
+        compiler : str
+            Compiler name (``emcc``, or ``msvc`` on Windows).
+        debug : bool
+            Whether to compile in debug mode.
+        clean : bool
+            Whether to remove previously compiled files before compiling.
+
+        Raises
+        ------
+        RuntimeError
+            If the compilation fails.
+
+        Returns
+        -------
+        None
+            Compiles the project; does not return a value.
+        """
+        if compiler == 'msvc':
+            return super(WASMStandaloneDevice, self).compile_source(directory, compiler,
+                                                                    debug, clean)
+        cache = None
+        cache_time = 0.0
+        start_time = time.time()
+        if prefs.devices.wasm_standalone.object_cache:
+            version = emcc_version(prefs.devices.wasm_standalone.emsdk_directory)
+            if version is None:
+                logger.debug("Cannot determine the emcc version, not using the object cache.")
+            else:
+                cache = ObjectCache(prefs.devices.wasm_standalone.object_cache_directory
+                                    or default_cache_directory(),
+                                    version, self.object_compile_flags)
+        include_dirs = [flag[2:] for flag in self.object_compile_args
+                        if flag.startswith('-I')]
+        cache_time += time.time() - start_time
+        jobs = prefs.devices.wasm_standalone.compile_jobs or os.cpu_count() or 1
+        simd = prefs.devices.wasm_standalone.simd
+        with in_directory(directory):
+            if clean:
+                # Clean before restoring cached files, make would delete them otherwise
+                with std_silent(debug):
+                    start_time = time.time()
+                    os.system("make clean >/dev/null 2>&1")
+                    self.timers["compile"]["clean"] = time.time() - start_time
+            makefile_time = os.path.getmtime('makefile')
+            keys = {}
+            to_compile = []
+            for source_file in sorted(self.writer.source_files):
+                if not source_file.endswith('.cpp'):
+                    continue
+                object_file = source_file[:-len('.cpp')] + '.o'
+                # Only compile object files that make would recompile. With
+                # SIMD, the vectorization report of the skipped or restored
+                # files is taken from the previous compilation; files without
+                # a report are compiled again.
+                if (os.path.exists(object_file) and
+                        os.path.getmtime(object_file) >= max(os.path.getmtime(source_file),
+                                                             makefile_time)):
+                    if not simd:
+                        continue
+                    counts = _read_vectorization_counts(object_file)
+                    if counts is not None:
+                        self._record_vectorization(source_file, counts)
+                        continue
+                if cache is not None:
+                    start_time = time.time()
+                    keys[object_file] = key = cache.key(source_file, include_dirs)
+                    info = cache.restore_info(key) or {}
+                    restored = ((not simd or 'vectorization' in info)
+                                and cache.restore(key, object_file))
+                    cache_time += time.time() - start_time
+                    if restored:
+                        if simd:
+                            _write_vectorization_counts(object_file, info['vectorization'])
+                            self._record_vectorization(source_file, info['vectorization'])
+                        continue
+                to_compile.append((source_file, object_file))
+            if cache is not None:
+                logger.debug(f"Restored {len(keys) - len(to_compile)} of {len(keys)} "
+                             f"object files from the cache.")
+
+            start_time = time.time()
+            self.timers["compile"]["files"] = self._compile_objects(to_compile, jobs, debug)
+            self.timers["compile"]["objects"] = time.time() - start_time
+
+            if cache is not None:
+                start_time = time.time()
+                for source_file, object_file in to_compile:
+                    info = None
+                    if simd:
+                        info = {'vectorization': self.vectorization_report[source_file]}
+                    cache.store(keys[object_file], object_file, info)
+                cache_time += time.time() - start_time
+            if prefs.devices.wasm_standalone.object_cache:
+                self.timers["compile"]["cache"] = cache_time
+
+            # Link the final module
+            with std_silent(debug):
+                make_cmd = prefs.devices.cpp_standalone.make_cmd_unix
+                make_args = " ".join(arg for arg in prefs.devices.cpp_standalone.extra_make_args_unix
+                                     if arg != '-j')
+                start_time = time.time()
+                x = os.system(f"{make_cmd} -j{jobs} {make_args}")
+                self.timers["compile"]["make"] = time.time() - start_time
+                if x != 0:
+                    error_message = (
+                        "Project compilation failed (error code: %u)." % x
+                    )
+                    if not clean:
+                        error_message += (
+                            " Consider running with "
+                            '"clean=True" to force a complete '
+                            "rebuild."
+                        )
+                    raise RuntimeError(error_message)
+
+    def _compile_objects(self, to_compile, jobs, debug):
+        """
+        Compile source files to object files with a pool of ``emcc`` processes.
+
+        Parameters
+        ----------
+        to_compile : list of tuple
+            ``(source_file, object_file)`` pairs, relative to the current directory.
+        jobs : int
+            The maximal number of parallel ``emcc`` processes.
+        debug : bool
+            Whether to show the compiler output.
+
+        Raises
+        ------
+        RuntimeError
+            If the compilation of a file fails.
+
+        Returns
+        -------
+        dict
+            The compilation time (in seconds) for each source file.
+        """
+        if not to_compile:
+            return {}
+        start_time = time.time()
+        env = _emsdk_environment(prefs.devices.wasm_standalone.emsdk_directory,
+                                prefs.devices.wasm_standalone.emsdk_version)
+        self.timers["compile"]["emsdk_activation"] = time.time() - start_time
+        emcc = shutil.which('emcc', path=env.get('PATH')) or 'emcc'
+
+        simd = prefs.devices.wasm_standalone.simd
+        # Optimisation remarks do not change the compiled code, they are
+        # therefore not part of the makefile (and the object cache key)
+        remark_args = VECTORIZATION_REMARK_ARGS if simd else []
+
+        def compile_file(source_and_object):
+            source_file, object_file = source_and_object
+            start_time = time.time()
+            result = subprocess.run([emcc] + self.object_compile_args + remark_args
+                                    + [source_file, '-o', object_file],
+                                    env=env, capture_output=True, text=True)
+            return source_file, object_file, time.time() - start_time, result
+
+        timings = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for source_file, object_file, duration, result in pool.map(compile_file, to_compile):
+                timings[source_file] = duration
+                if simd and result.returncode == 0:
+                    counts = {'vectorized': result.stderr.count('remark: vectorized loop'),
+                              'not_vectorized': result.stderr.count('remark: loop not vectorized')}
+                    # Kept for later builds that do not recompile the file
+                    _write_vectorization_counts(object_file, counts)
+                    self._record_vectorization(source_file, counts)
+                if debug or result.returncode != 0:
+                    output = (result.stdout + result.stderr).strip()
+                    if output:
+                        print(output)
+                if result.returncode != 0:
+                    failed.append(source_file)
+        if failed:
+            raise RuntimeError(f"Compilation of {', '.join(failed)} failed, see the "
+                               f"compiler output above.")
+        return timings
+
+    def _record_vectorization(self, source_file, counts):
+        """
+        Store how many loops of a source file the compiler vectorized.
+
+        The counts of vectorized and non-vectorized loops are stored in
+        ``self.vectorization_report``. For the code objects of the
+        ``stateupdate``, ``threshold`` and ``reset`` templates, a message is
+        logged if no loop was vectorized.
+
+        Parameters
+        ----------
+        source_file : str
+            The compiled source file.
+        counts : dict
+            The number of vectorized (``"vectorized"``) and non-vectorized
+            (``"not_vectorized"``) loops, counted in the optimisation remarks
+            of the compiler.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Updates the vectorization report; does not return a value.
+        """
+        vectorized = counts['vectorized']
+        self.vectorization_report[source_file] = {'vectorized': vectorized,
+                                                  'not_vectorized': counts['not_vectorized']}
+        name = os.path.splitext(os.path.basename(source_file))[0]
+        codeobj = self.code_objects.get(name)
+        if (codeobj is not None and codeobj.template_name in VECTORIZED_TEMPLATES
+                and vectorized == 0):
+            message = (f"No loop in '{name}' ({codeobj.template_name} template) was "
+                       f"vectorized, the code will not profit from SIMD instructions.")
+            # Threshold and reset loops append to the spike list or use indirect
+            # indexing, and are often not vectorizable
+            if codeobj.template_name == 'stateupdate':
+                logger.info(message, 'simd_not_vectorized')
+            else:
+                logger.debug(message, 'simd_not_vectorized')
+
+    def write_static_arrays(self, directory):
+        """
+        Write the static arrays to the project's ``static_arrays`` directory.
+
+        In addition to the raw files written by ``CPPStandaloneDevice``, a
+        zlib-compressed version (with the extension ``.z``) of each array is
+        written if the ``compress_static_arrays`` preference is set.
+
+        Parameters
+        ----------
+        directory : str
+            The project directory.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Writes the files to disk; does not return a value.
+        """
+        super(WASMStandaloneDevice, self).write_static_arrays(directory)
+        if prefs.devices.wasm_standalone.compress_static_arrays:
+            for name in self.static_arrays:
+                fname = os.path.join(directory, 'static_arrays', name)
+                with open(fname, 'rb') as f:
+                    data = f.read()
+                with open(fname + '.z', 'wb') as f:
+                    f.write(zlib.compress(data, 9))
+
+    def static_array_files(self):
+        """
+        Return the files of the static arrays used by the simulation.
+
+        Parameters
+        ----------
+        None
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        list of str
+            The file names, relative to the project directory.
+        """
+        suffix = '.z' if prefs.devices.wasm_standalone.compress_static_arrays else ''
+        return [f'static_arrays/{name}{suffix}' for name in sorted(self.static_arrays.keys())]
+
+    def generate_config_source(self, writer):
+        """
+        Generate ``brian_config.js`` with information about the build.
+
+        The file is loaded by ``worker.js`` and defines a ``brian_config``
+        object with the files of the static arrays that the worker has to
+        fetch (for ``static_array_loading = "fetch"``), the file packages that
+        it downloads once and hands to every instance (for
+        ``static_array_loading = "preload"``), and the hash of the
+        compiled module that the worker uses as the key for the browser cache
+        (for ``browser_cache = True``).
+
+        Parameters
+        ----------
+        writer : CPPWriter
+            Object for writing generated files.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Writes the file to disk; does not return a value.
+        """
+        if prefs.devices.wasm_standalone.static_array_loading == 'fetch':
+            fetched_files = self.static_array_files()
+        else:
+            fetched_files = []
+        if (prefs.devices.wasm_standalone.static_array_loading == 'preload'
+                and self.static_array_files()):
+            packages = ['wasm_module.data']
+        else:
+            packages = []
+        config = {'static_arrays': fetched_files,
+                  'preloaded_packages': packages,
+                  'build_hash': self.build_hash,
+                  'browser_cache': prefs.devices.wasm_standalone.browser_cache}
+        writer.write('brian_config.js', f'var brian_config = {json.dumps(config, indent=4)};\n')
+
+    def compute_build_hash(self, directory):
+        """
+        Compute a hash that identifies the compiled WebAssembly module.
+
+        Parameters
+        ----------
+        directory : str
+            The project directory.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        str or None
+            The first 16 hexadecimal digits of the SHA-256 hash of
+            ``wasm_module.wasm``, or ``None`` if the file does not exist.
+        """
+        wasm_file = os.path.join(directory, 'wasm_module.wasm')
+        if not os.path.exists(wasm_file):
+            return None
+        with open(wasm_file, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+
+    def write_build_timings(self, directory):
+        """
+        Write the time spent in each phase of the build.
+
+        The timings (``self.timers``) are written to ``build_timings.json``
+        in the project directory, and a summary is logged (with level
+        ``INFO`` if the ``print_build_timings`` preference is set, and
+        ``DEBUG`` otherwise).
+
+        Parameters
+        ----------
+        directory : str
+            The project directory.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Writes the timings to disk; does not return a value.
+        """
+        with open(os.path.join(directory, 'build_timings.json'), 'w') as f:
+            json.dump(self.timers, f, indent=2)
+        compile_timers = self.timers['compile']
+        lines = ['Build timings:']
+        for phase, duration in self.timers['build'].items():
+            lines.append(f'  {phase:40s} {duration:8.2f}s')
+            if phase == 'compile_source':
+                for label, key in (("'make clean'", 'clean'),
+                                   ('emsdk activation', 'emsdk_activation'),
+                                   ('object cache', 'cache'),
+                                   ('compiling objects', 'objects'),
+                                   ("linking ('make')", 'make')):
+                    if compile_timers.get(key) is not None:
+                        lines.append(f'    {label:38s} {compile_timers[key]:8.2f}s')
+                    if key == 'objects':
+                        # The slowest files
+                        for source_file, file_duration in sorted(compile_timers['files'].items(),
+                                                                 key=lambda item: -item[1])[:3]:
+                            name = os.path.basename(source_file)[:36]
+                            lines.append(f'      {name:36s} {file_duration:8.2f}s')
+        message = '\n'.join(lines)
+        if prefs.devices.wasm_standalone.print_build_timings:
+            logger.info(message)
+        else:
+            logger.debug(message)
+
+    def write_size_report(self, directory):
+        """
+        Create a report of the size of the compiled project.
+
+        The report (see `brian2wasm.size_report.size_report`) is stored in
+        ``self.size_report``, written to ``size_report.json`` in the project
+        directory, and logged.
+
+        Parameters
+        ----------
+        directory : str
+            The project directory.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Writes the report to disk; does not return a value.
+        """
+        try:
+            self.size_report = size_report(directory, self.code_objects.keys())
+        except (OSError, ValueError, IndexError) as ex:
+            logger.debug(f"Could not create the size report: {ex}")
+            self.size_report = None
+            return
+        with open(os.path.join(directory, 'size_report.json'), 'w') as f:
+            json.dump(self.size_report, f, indent=2)
+        logger.info(format_size_report(self.size_report))
 
     def copy_source_files(self, writer, directory):
         """
@@ -423,6 +1425,33 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
                             "function")
         return report_func
 
+    def seed(self, seed=None):
+        """
+        Set the seed for the random number generators.
+
+        A seed set from JavaScript (see `_seed_from_javascript` in
+        ``objects.cpp``) takes precedence over the seed set in the script, so
+        that runs started from the browser are reproducible.
+
+        Parameters
+        ----------
+        seed : int, optional
+            The seed value for the random number generators, or ``None`` (the
+            default) to set a random seed.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Adds the seeding code to the main queue; does not return a value.
+        """
+        self.main_queue.append(('insert_code', 'if (!_seed_from_javascript())\n{'))
+        super(WASMStandaloneDevice, self).seed(seed)
+        self.main_queue.append(('insert_code', '}'))
+
     def network_run(self, net, duration, report=None, report_period=10*second,
                     namespace=None, profile=None, level=0, **kwds):
         """
@@ -492,6 +1521,9 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         if namespace is None:
             namespace = get_local_namespace(level=level+2)
 
+        # Entries added by the network's code objects (e.g. before_run code),
+        # needed to continue the run (see below)
+        queue_start = len(self.main_queue)
         net.before_run(namespace)
         self.synapses |= {s for s in net.objects
                           if isinstance(s, Synapses)}
@@ -547,6 +1579,7 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         run_lines.extend(self.code_lines['before_network_run'])
         if not self.run_args_applied:
             run_lines.append('set_from_command_line(args);')
+            run_lines.append('_set_from_javascript();')
             self.run_args_applied = True
         run_lines.append(f'{net.name}.run({float(duration)!r}, {report_call}, {float(report_period)!r});')
         run_lines.extend(self.code_lines['after_network_run'])
@@ -554,6 +1587,29 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
 
         net.after_run()
 
+        # Let brian_run_for (see run.cpp) continue this run from JavaScript,
+        # with the same steps as for a subsequent call of run
+        continue_lines = []
+        for func, args in self.main_queue[queue_start:]:
+            if func in ('before_run_code_object', 'after_run_code_object'):
+                continue_lines.append(f'_{func[:-len("_code_object")]}_{args[0].name}();')
+            elif func == 'run_network':
+                continue_lines.extend(self.code_lines['before_network_run'])
+                continue_lines.append(f'{net.name}.run(duration, {report_call}, {float(report_period)!r});')
+                continue_lines.extend(self.code_lines['after_network_run'])
+        # Finalisations (e.g. sending the last chunk of streamed monitors),
+        # called by main after all runs
+        for codeobj in self.code_objects.values():
+            if hasattr(codeobj.code, 'main_finalise'):
+                continue_lines.extend(codeobj.code.main_finalise.splitlines())
+        self.main_queue.append(('insert_code',
+                                '\n'.join([f'_resumable_network = &{net.name};',
+                                           '_continue_network_run = [](double duration)',
+                                           '{',
+                                           '    using namespace brian;']
+                                          + [f'    {line}' for line in continue_lines]
+                                          + ['};'])))
+
         # Manually set the cache for the clocks, simulation scripts might
         # want to access the time (which has been set in code and is therefore
         # not accessible by the normal means until the code has been built and
@@ -575,8 +1631,14 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         """
         Execute the compiled WASM simulation in a browser environment.
 
-        This method launches the simulation using ``emrun`` and provides
-        browser-based progress reporting and visualization.
+        This method serves the project with ``brian2wasm.server`` and opens it
+        in the default web browser, which runs the simulation and visualizes
+        the results. The server runs until it is interrupted, or in the
+        background with the ``background_server`` preference (only in
+        interactive sessions). If the
+        ``run_target`` preference is set to ``'node'`` (or the
+        ``BRIAN2WASM_HEADLESS`` environment variable is set to ``1``), the
+        simulation is run in Node.js instead, see `run_headless`.
 
         Parameters
         ----------
@@ -587,18 +1649,23 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
         with_output : bool
             Whether to forward stdout/stderr output.
         run_args : list
-            Extra command-line arguments for the execution environment.
+            Command-line arguments for the simulation (only used for headless
+            runs, in the browser the arguments are set by the page).
 
         Raises
         ------
-        RuntimeError
-            If the server cannot be launched or required files are missing.
+        OSError
+            If the server cannot find a free port.
 
         Returns
         -------
         None
             Runs the simulation in a browser; does not return a value.
         """
+        if (prefs.devices.wasm_standalone.run_target == 'node' or
+                os.environ.get('BRIAN2WASM_HEADLESS', '0') == '1'):
+            return self.run_headless(directory, with_output, run_args)
+
         html_file = self.build_options['html_file']
         html_content = self.build_options['html_content']
         if html_file is None:
@@ -624,24 +1691,166 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
             else:  # HTML file exists, copy it to the project directory
                 shutil.copy(html_file, os.path.join(self.project_dir, 'index.html'))
 
+        packaged = (prefs.devices.wasm_standalone.package or
+                    os.environ.get('BRIAN2WASM_PACKAGE', '0') == '1')
+        if packaged:
+            dist_directory = package(directory)
+            logger.info(f"Packaged the project for deployment in '{dist_directory}'.")
+
         with in_directory(directory):
             if os.environ.get('BRIAN2WASM_NO_SERVER','0') == '1':
                 print("Skipping server startup (--no-server flag set)")
                 return
 
-            emsdk_path = prefs.devices.wasm_standalone.emsdk_directory
-            os.environ['EMSDK_QUIET'] = '1'
+            served_directory = os.path.abspath(dist_directory if packaged else '.')
+            if prefs.devices.wasm_standalone.background_server:
+                if _interactive_session():
+                    serve_in_background(served_directory,
+                                        prefix=os.path.basename(os.path.abspath('.')))
+                    return
+                # The daemon thread would end with the script
+                logger.warn("The 'background_server' preference only works in interactive "
+                            "sessions, serving the project in the foreground instead.",
+                            name_suffix='background_server', once=True)
+            start_time = time.time()
+            serve(served_directory)
+            self.timers['run_binary'] = time.time() - start_time
 
-            if platform.system() == "Windows":
-                cmd_line = f'cmd.exe /C "call {emsdk_path}\\emsdk_env.bat & emrun index.html"'
+    def run_headless(self, directory, with_output, run_args):
+        """
+        Execute the compiled WASM simulation in Node.js.
 
-            else:
-                run_cmd = ['source', f'{emsdk_path}/emsdk_env.sh', '&&', 'emrun', 'index.html']
-                cmd_line = f"/bin/bash -c '{' '.join(run_cmd + run_args)}'"
+        The simulation runs in ``node_runner.js``, which emulates the web
+        worker environment of ``worker.js``. The result files are written to
+        the results directory, so that the recorded values can be accessed in
+        Python after the run (see `get_value`), as for the ``cpp_standalone``
+        device. This includes the profiling information of runs with
+        ``profile=True``, so that `profiling_summary` can be used; the number
+        of calls and the share of the time for each code object are stored in
+        ``self.profiling_info``.
 
-            start_time = time.time()
-            os.system(cmd_line)
-            self.timers['run_binary'] = time.time() - start_time
+        Parameters
+        ----------
+        directory : str
+            Build directory containing compiled files.
+        with_output : bool
+            Whether to show the output of the simulation. If False, it is
+            written to ``stdout.txt`` in the results directory instead.
+        run_args : list of str
+            Arguments of the form ``name=value`` that are passed on to the
+            simulation (e.g. ``'neurongroup.tau=0.01'``).
+
+        Raises
+        ------
+        RuntimeError
+            If the simulation fails.
+
+        Returns
+        -------
+        None
+            Runs the simulation and stores its results; does not return a value.
+        """
+        runner = os.path.join(os.path.dirname(__file__), 'templates', 'node_runner.js')
+        ensure_directory(self.results_dir)
+        # Invalidate cached values that the run changes
+        for arg in run_args:
+            name = arg.split('=', 1)[0]
+            for var in self.array_cache:
+                if hasattr(var.owner, 'name') and f'{var.owner.name}.{var.name}' == name:
+                    self.array_cache[var] = None
+        for clock in self.clocks:
+            self.array_cache[clock.variables['t']] = None
+        # The results of earlier runs will be overwritten
+        self.result_cache.clear()
+        profiling_fname = os.path.join(self.results_dir, 'profiling.json')
+        if os.path.exists(profiling_fname):
+            os.remove(profiling_fname)
+
+        cmd = ([prefs.devices.wasm_standalone.node_executable, runner,
+                os.path.abspath(directory), '--results', self.results_dir]
+               + [arg for arg in run_args if '=' in arg])
+        stdout = None if with_output else open(os.path.join(self.results_dir, 'stdout.txt'), 'w')
+        start_time = time.time()
+        try:
+            Network._globally_running = True
+            x = subprocess.call(cmd, stdout=stdout)
+        finally:
+            Network._globally_running = False
+            if stdout is not None:
+                stdout.close()
+        self.timers['run_binary'] = time.time() - start_time
+        if x:
+            raise RuntimeError(f"Project run failed (project directory: "
+                               f"{os.path.abspath(directory)})")
+        self.has_been_run = True
+        run_info_fname = os.path.join(self.results_dir, 'last_run_info.txt')
+        if os.path.isfile(run_info_fname):
+            with open(run_info_fname) as f:
+                run_time, completed_fraction = f.read().split()
+            self._last_run_time = float(run_time)
+            self._last_run_completed_fraction = float(completed_fraction)
+        # The times are also in profiling_info.txt, used by profiling_summary
+        if os.path.exists(profiling_fname):
+            with open(profiling_fname) as f:
+                self.profiling_info = json.load(f)
+
+    def get_value(self, var, access_data=True):
+        """
+        Get the values of a variable, loading results lazily from disk.
+
+        After a run, the values are not read eagerly from the result files:
+        each file is memory-mapped (read-only) on the first access to its
+        variable, so that only the parts of the file that are actually used
+        are read. The mapping is reused for later accesses, unless the file
+        has been overwritten in the meantime (e.g. by a new run).
+
+        Parameters
+        ----------
+        var : ArrayVariable
+            The variable.
+        access_data : bool, optional
+            Whether to access the underlying data. Default is True.
+
+        Raises
+        ------
+        NotImplementedError
+            If the values are not known before the simulation has been run.
+        IndexError
+            If the size of a 2d result file does not match the variable.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values of the variable.
+        """
+        if self.array_cache.get(var, None) is not None or not self.has_been_run:
+            return super(WASMStandaloneDevice, self).get_value(var, access_data)
+        fname = os.path.join(self.results_dir, self.get_array_filename(var))
+        mtime = os.stat(fname).st_mtime_ns
+        if var in self.result_cache and self.result_cache[var][0] == mtime:
+            return self.result_cache[var][1]
+        if os.path.getsize(fname) == 0:
+            data = np.zeros(0, dtype=var.dtype)  # cannot memory-map empty files
+        else:
+            data = np.memmap(fname, dtype=var.dtype, mode='r')
+        # Our 2d dynamic arrays are only expanding in one dimension, the other
+        # dimension has size 0 at the beginning (as in CPPStandaloneDevice)
+        if isinstance(var.size, tuple) and len(var.size) == 2:
+            if var.size[0] * var.size[1] == len(data):
+                size = var.size
+            elif var.size[0] == 0:
+                size = (len(data) // var.size[1], var.size[1])
+            elif var.size[1] == 0:
+                size = (var.size[0], len(data) // var.size[0])
+            else:
+                raise IndexError(f"Do not know how to deal with 2d array of size "
+                                 f"{var.size!s}, the array on disk has length {len(data)}.")
+            var.size = size
+            data = data.reshape(size)
+        else:
+            var.size = len(data)
+        self.result_cache[var] = (mtime, data)
+        return data
 
     def build(self, html_file=None, html_content=None, **kwds):
         """
@@ -798,48 +2007,56 @@ class WASMStandaloneDevice(CPPStandaloneDevice):
             raise ValueError("OpenMP threads cannot be negative.")
         self.check_openmp_compatible(nb_threads)
 
-        self.write_static_arrays(directory)
+        with self._timed('write_static_arrays'):
+            self.write_static_arrays(directory)
 
         names = [o.name for n in self.networks for o in n.sorted_objects]
         dupes = [n for n, c in Counter(names).items() if c > 1]
         if dupes:
             raise ValueError("Duplicate object names: " + ", ".join(f"'{n}'" for n in dupes))
 
-        self.generate_objects_source(self.writer, self.arange_arrays, self.synapses,
-                                     self.static_array_specs, self.networks, self.timed_arrays)
-        self.generate_main_source(self.writer)
-        self.generate_codeobj_source(self.writer)
-        self.generate_network_source(self.writer, compiler)
-        self.generate_synapses_classes_source(self.writer)
-        self.generate_run_source(self.writer)
-        self.copy_source_files(self.writer, directory)
+        with self._timed('generate_objects_source'):
+            self.generate_objects_source(self.writer, self.arange_arrays, self.synapses,
+                                         self.static_array_specs, self.networks, self.timed_arrays)
+        with self._timed('generate_main_source'):
+            self.generate_main_source(self.writer)
+        with self._timed('generate_codeobj_source'):
+            self.generate_codeobj_source(self.writer)
+        with self._timed('generate_network_source'):
+            self.generate_network_source(self.writer, compiler)
+        with self._timed('generate_synapses_classes_source'):
+            self.generate_synapses_classes_source(self.writer)
+        with self._timed('generate_run_source'):
+            self.generate_run_source(self.writer)
+        with self._timed('generate_config_source'):
+            self.generate_config_source(self.writer)
+        with self._timed('copy_source_files'):
+            self.copy_source_files(self.writer, directory)
         self.writer.source_files.update(additional_source_files)
 
-        self.generate_makefile(
-            self.writer,
-            compiler,
-            compiler_flags=" ".join(compiler_flags),
-            linker_flags=" ".join(linker_flags),
-            nb_threads=nb_threads,
-            debug=debug,
-        )
+        with self._timed('generate_makefile'):
+            self.generate_makefile(
+                self.writer,
+                compiler,
+                compiler_flags=" ".join(compiler_flags),
+                linker_flags=" ".join(linker_flags),
+                nb_threads=nb_threads,
+                debug=debug,
+            )
 
         if compile:
-            # We switch the compiler name back to `mscv` on Windows, to make sure it uses `nmake`
-            self.compile_source(directory, 'msvc' if os.name == 'nt' else compiler, debug, clean)
-            if run:
-                self.run(directory, results_directory, with_output, run_args)
-
-        tm = self.timers
-        logger.debug("Time measurements: " + ", ".join(
-            f"{lbl}: {tm[g][k]:.2f}s" if isinstance(tm[g], dict) else f"{lbl}: {tm[g]:.2f}s"
-            for lbl, g, k in (
-                ("'make clean'", "compile", "clean"),
-                ("'make'", "compile", "make"),
-                ("running 'main'", "run_binary", None),
-            )
-            if (k and tm[g][k] is not None) or (not k and tm[g] is not None)
-        ))
+            with self._timed('compile_source'):
+                # We switch the compiler name back to `mscv` on Windows, to make sure it uses `nmake`
+                self.compile_source(directory, 'msvc' if os.name == 'nt' else compiler, debug, clean)
+            with self._timed('size_report'):
+                # The hash of the compiled code is only known now
+                self.build_hash = self.compute_build_hash(directory)
+                self.generate_config_source(self.writer)
+                self.write_size_report(directory)
+        # Written before running, since the preview server runs until interrupted
+        self.write_build_timings(directory)
+        if compile and run:
+            self.run(directory, results_directory, with_output, run_args)
 
 
 wasm_standalone_device = WASMStandaloneDevice()
@@ -43,4 +43,45 @@ def send_spike(i, t):
         neuron index and time. The Python function body is a no-op (``pass``), as the actual
         implementation is handled in C++ and executed in the WebAssembly environment.
     """
-    pass
\ No newline at end of file
+    pass
+
+@implementation('cpp', '''
+double stream_spike(int i, double t) {
+    brian::_spike_stream.push(i, t);
+    return 0.0;  // dummy return
+}
+''')
+@check_units(i=1, t=second, result=1)
+def stream_spike(i, t):
+    """
+        Add a spike to the batched spike stream sent to JavaScript.
+
+        In contrast to `send_spike`, this function does not send a message for
+        every spike. Spikes are collected in a buffer on the WebAssembly side and
+        sent as a single ``{type: 'spikes', i: Int32Array, t: Float64Array}``
+        message per chunk, which is handed to the ``onSpikes`` method of
+        ``BrianSimulation``.
+
+        Parameters
+        ----------
+        i : int
+            The index of the neuron or synapse emitting the spike.
+        t : Quantity
+            The time of the spike event, with units of seconds.
+
+        Returns
+        -------
+        float
+            A dummy return value of 0.0, as the function's primary effect is to
+            store the spike.
+
+        Notes
+        -----
+        A chunk is sent when it covers the simulated time set by the
+        ``devices.wasm_standalone.spike_stream_interval`` preference, when
+        the wall-clock time set by
+        ``devices.wasm_standalone.spike_stream_wallclock_interval`` has passed
+        since its first spike, and at the end of the simulation. As for
+        `send_spike`, the Python function body is a no-op.
+    """
+    pass
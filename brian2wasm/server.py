@@ -0,0 +1,371 @@
+"""
+Minimal web server for previewing WASM simulations.
+
+In contrast to ``emrun``, this server sends the ``Cross-Origin-Opener-Policy``
+and ``Cross-Origin-Embedder-Policy`` headers that browsers require before they
+allow the use of ``SharedArrayBuffer``, and therefore multithreaded builds.
+It also serves packaged projects (see `brian2wasm.deploy`): precompressed
+files are sent with the corresponding ``Content-Encoding``, and files with
+content-hashed names are marked as cacheable indefinitely. Other files are
+compressed on the fly.
+
+The server runs in the Python process, either in the foreground (`serve`) or
+in a background thread (`serve_in_background`), where it can serve several
+projects at once under different URL prefixes. It only needs the standard
+library and can be started with ``python -m brian2wasm.server [directory]``.
+"""
+import argparse
+import email.utils
+import gzip
+import html
+import io
+import os
+import re
+import threading
+import urllib.parse
+import webbrowser
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from brian2.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PreviewRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Request handler that serves files with cross-origin isolation headers.
+    """
+
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map,
+                          **{'.wasm': 'application/wasm',
+                             '.js': 'text/javascript'})
+
+    #: Precompressed versions of files, in order of preference
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    #: Content-hashed file names, as written by `brian2wasm.deploy.package`
+    hashed_name = re.compile(r'\.[0-9a-f]{10}(\.[^./]+)?$')
+
+    #: Files without a precompressed version that are compressed on the fly
+    compressible = ('.js', '.wasm', '.data', '.html', '.json', '.css', '.txt')
+
+    def translate_path(self, path):
+        # Map the URL prefixes of a PreviewServer to their directories
+        mounts = getattr(self.server, 'mounts', None)
+        if not mounts:
+            return super().translate_path(path)
+        for prefix in sorted(mounts, key=len, reverse=True):
+            if path.startswith(prefix) or path.split('?')[0] == prefix.rstrip('/'):
+                self.directory = mounts[prefix]
+                return super().translate_path(path[len(prefix.rstrip('/')):] or '/')
+        return ''  # not found
+
+    def send_head(self):
+        mounts = getattr(self.server, 'mounts', None)
+        if mounts and '/' not in mounts and self.path.split('?')[0] == '/':
+            return self.send_mount_index()
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            accepted = {value.split(';')[0].strip()
+                        for value in self.headers.get('Accept-Encoding', '').split(',')}
+            for encoding, extension in self.encodings:
+                if encoding in accepted and os.path.isfile(path + extension):
+                    return self.send_encoded(path, open(path + extension, 'rb'), encoding)
+            if 'gzip' in accepted and path.endswith(self.compressible):
+                with open(path, 'rb') as f:
+                    compressed = gzip.compress(f.read(), compresslevel=6, mtime=0)
+                return self.send_encoded(path, io.BytesIO(compressed), 'gzip')
+        return super().send_head()
+
+    def send_encoded(self, path, content, encoding):
+        """
+        Send the headers for a compressed version of a file.
+
+        Parameters
+        ----------
+        path : str
+            The requested file.
+        content : file
+            The compressed content, opened in binary mode.
+        encoding : str
+            The encoding of the compressed content (e.g. ``'br'``).
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        file
+            The compressed content, to be copied to the client.
+        """
+        content.seek(0, os.SEEK_END)
+        length = content.tell()
+        content.seek(0)
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Last-Modified', email.utils.formatdate(os.path.getmtime(path), usegmt=True))
+        self.end_headers()
+        return content
+
+    def send_mount_index(self):
+        """
+        Send a page with links to all projects served by a `PreviewServer`.
+
+        Parameters
+        ----------
+        None
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        file
+            The page, to be copied to the client.
+        """
+        links = ''.join(f'<li><a href="{prefix}">{html.escape(urllib.parse.unquote(prefix))}</a> '
+                        f'({html.escape(directory)})</li>'
+                        for prefix, directory in sorted(self.server.mounts.items()))
+        page = f'<!DOCTYPE html><html><body><h1>Brian simulations</h1><ul>{links}</ul></body></html>'
+        content = page.encode('utf-8')
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        return io.BytesIO(content)
+
+    def end_headers(self):
+        self.send_header('Cross-Origin-Opener-Policy', 'same-origin')
+        self.send_header('Cross-Origin-Embedder-Policy', 'require-corp')
+        if self.hashed_name.search(self.path.split('?')[0]):
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        else:
+            self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class PreviewServer(ThreadingHTTPServer):
+    """
+    Web server that serves one or more directories under URL prefixes.
+
+    Parameters
+    ----------
+    port : int, optional
+        The port to listen on. If the port is in use, the next free port is
+        used. Default is 8000.
+    host : str, optional
+        The host name to listen on. Default is ``'localhost'``.
+
+    Raises
+    ------
+    OSError
+        If no free port could be found.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=8000, host='localhost'):
+        for candidate in range(port, port + 100):
+            try:
+                super().__init__((host, candidate), PreviewRequestHandler)
+                break
+            except OSError:
+                continue
+        else:
+            raise OSError(f"Could not find a free port between {port} and {port + 99}.")
+        #: Dictionary mapping URL prefixes (starting and ending with ``/``)
+        #: to the served directories
+        self.mounts = {}
+        self.host = host
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        The base URL of the server.
+        """
+        return f'http://{self.host}:{self.server_address[1]}'
+
+    def mount(self, directory, prefix='/'):
+        """
+        Serve a directory under a URL prefix.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to serve.
+        prefix : str, optional
+            The URL prefix, e.g. ``'/my_simulation/'``. A previously mounted
+            directory with the same prefix is replaced. Default is ``'/'``.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        str
+            The URL of the directory.
+        """
+        prefix = '/' + urllib.parse.quote(prefix.strip('/'))
+        if not prefix.endswith('/'):
+            prefix += '/'
+        self.mounts[prefix] = os.path.abspath(directory)
+        return self.url + prefix
+
+    def start(self):
+        """
+        Start serving in a background (daemon) thread.
+
+        Parameters
+        ----------
+        None
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Starts the thread; does not return a value.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve_forever, daemon=True,
+                                           name='brian2wasm-preview-server')
+            self.thread.start()
+
+    def stop(self):
+        """
+        Stop the server and close its socket.
+
+        Parameters
+        ----------
+        None
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+            Stops the server; does not return a value.
+        """
+        if self.thread is not None:
+            self.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server_close()
+
+
+_background_server = None
+
+
+def serve_in_background(directory, prefix=None, page='index.html', open_browser=True,
+                        port=8000):
+    """
+    Serve a directory from a server running in a background thread.
+
+    All directories are served by the same server (started on the first
+    call), so that several projects can be previewed at the same time. The
+    server stops when the Python process ends.
+
+    Parameters
+    ----------
+    directory : str
+        The directory to serve.
+    prefix : str, optional
+        The URL prefix for the directory. Default is the name of the directory,
+        e.g. ``/my_simulation/``.
+    page : str, optional
+        The page to open in the browser. Default is ``'index.html'``.
+    open_browser : bool, optional
+        Whether to open the page in the default web browser. Default is True.
+    port : int, optional
+        The port for the server, if it has not been started yet. Default is
+        8000.
+
+    Raises
+    ------
+    OSError
+        If no free port could be found.
+
+    Returns
+    -------
+    str
+        The URL of the page.
+    """
+    global _background_server
+    if _background_server is None:
+        _background_server = PreviewServer(port)
+        _background_server.start()
+    if prefix is None:
+        prefix = os.path.basename(os.path.abspath(directory))
+    url = _background_server.mount(directory, prefix) + page
+    logger.info(f"Serving '{directory}' at {url}")
+    if open_browser:
+        webbrowser.open(url)
+    return url
+
+
+def serve(directory, port=8000, page='index.html', open_browser=True):
+    """
+    Serve a directory until the server is interrupted.
+
+    Parameters
+    ----------
+    directory : str
+        The directory to serve.
+    port : int, optional
+        The port to listen on. If the port is in use, the next free port is
+        used. Default is 8000.
+    page : str, optional
+        The page to open in the browser. Default is ``'index.html'``.
+    open_browser : bool, optional
+        Whether to open the page in the default web browser. Default is True.
+
+    Raises
+    ------
+    OSError
+        If no free port could be found.
+
+    Returns
+    -------
+    None
+        Serves files until interrupted with Ctrl+C; does not return a value.
+    """
+    server = PreviewServer(port)
+    url = server.mount(directory) + page
+    print(f"Serving '{directory}' at {url} (press Ctrl+C to stop)")
+    if open_browser:
+        webbrowser.open(url)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a (packaged) brian2wasm project.')
+    parser.add_argument('directory', nargs='?', default='.',
+                        help='The directory to serve (default: the current directory)')
+    parser.add_argument('--port', type=int, default=8000, help='The port to listen on')
+    parser.add_argument('--no-browser', action='store_true',
+                        help='Do not open the page in a web browser')
+    args = parser.parse_args()
+    serve(os.path.abspath(args.directory), port=args.port, open_browser=not args.no_browser)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Size reports for compiled WebAssembly modules.
+
+The report lists the sizes of the files that the browser downloads, the sizes
+of the sections of ``wasm_module.wasm``, and the size of the code of every
+function. Function names are taken from the symbol map written by ``emcc
+--emit-symbol-map``, since optimised builds do not contain a name section.
+"""
+import os
+import zlib
+
+#: Names of the standard WebAssembly sections, indexed by their id
+SECTION_NAMES = {0: 'custom', 1: 'type', 2: 'import', 3: 'function', 4: 'table',
+                 5: 'memory', 6: 'global', 7: 'export', 8: 'start', 9: 'element',
+                 10: 'code', 11: 'data', 12: 'datacount', 13: 'tag'}
+
+#: Files of a project that are downloaded by the browser
+DOWNLOADED_FILES = ('wasm_module.wasm', 'wasm_module.js', 'wasm_module.data')
+
+
+def _read_leb128(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def _skip_limits(data, pos):
+    flags = data[pos]
+    _, pos = _read_leb128(data, pos + 1)
+    if flags & 0x1:
+        _, pos = _read_leb128(data, pos)
+    return pos
+
+
+def _count_imported_functions(data, pos):
+    count, pos = _read_leb128(data, pos)
+    functions = 0
+    for _ in range(count):
+        for _ in range(2):  # module and field name
+            length, pos = _read_leb128(data, pos)
+            pos += length
+        kind = data[pos]
+        pos += 1
+        if kind == 0:  # function
+            _, pos = _read_leb128(data, pos)
+            functions += 1
+        elif kind == 1:  # table
+            pos = _skip_limits(data, pos + 1)
+        elif kind == 2:  # memory
+            pos = _skip_limits(data, pos)
+        elif kind == 3:  # global
+            pos += 2
+        elif kind == 4:  # tag
+            _, pos = _read_leb128(data, pos + 1)
+        else:
+            raise ValueError(f'Unknown import kind {kind}.')
+    return functions
+
+
+def wasm_sizes(wasm_file):
+    """
+    Determine the sizes of the sections and functions of a WebAssembly module.
+
+    Parameters
+    ----------
+    wasm_file : str
+        The ``.wasm`` file.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a WebAssembly module.
+
+    Returns
+    -------
+    sections : dict
+        Dictionary mapping section names to their size in bytes (custom
+        sections are listed with their name).
+    functions : dict
+        Dictionary mapping function indices (including imported functions) to
+        the size of their code in bytes.
+    """
+    with open(wasm_file, 'rb') as f:
+        data = f.read()
+    if data[:4] != b'\0asm':
+        raise ValueError(f"'{wasm_file}' is not a WebAssembly module.")
+    sections = {}
+    functions = {}
+    imported_functions = 0
+    pos = 8
+    while pos < len(data):
+        section_id = data[pos]
+        size, pos = _read_leb128(data, pos + 1)
+        end = pos + size
+        name = SECTION_NAMES.get(section_id, f'unknown ({section_id})')
+        if section_id == 0:
+            length, name_start = _read_leb128(data, pos)
+            name = 'custom: ' + data[name_start:name_start + length].decode('utf-8', 'replace')
+        elif section_id == 2:
+            imported_functions = _count_imported_functions(data, pos)
+        elif section_id == 10:
+            count, body = _read_leb128(data, pos)
+            for index in range(count):
+                body_size, body_start = _read_leb128(data, body)
+                functions[imported_functions + index] = body_size + (body_start - body)
+                body = body_start + body_size
+        sections[name] = sections.get(name, 0) + size
+        pos = end
+    return sections, functions
+
+
+def read_symbol_map(symbol_file):
+    """
+    Read a symbol map written by ``emcc --emit-symbol-map``.
+
+    Parameters
+    ----------
+    symbol_file : str
+        The symbol map file (``wasm_module.js.symbols``).
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    dict
+        Dictionary mapping function indices to function names. Empty if the
+        file does not exist.
+    """
+    symbols = {}
+    if not os.path.exists(symbol_file):
+        return symbols
+    with open(symbol_file) as f:
+        for line in f:
+            index, _, name = line.rstrip('\n').partition(':')
+            if index.isdigit():
+                symbols[int(index)] = name
+    return symbols
+
+
+def size_report(directory, code_object_names=()):
+    """
+    Create a size report for a compiled project.
+
+    Parameters
+    ----------
+    directory : str
+        The project directory.
+    code_object_names : iterable of str, optional
+        Names of the code objects. The sizes of all functions with a code
+        object's name in their (mangled) name are added up for that code
+        object; the code of all other functions is listed as ``"other"``.
+
+    Raises
+    ------
+    ValueError
+        If ``wasm_module.wasm`` is not a WebAssembly module.
+
+    Returns
+    -------
+    dict
+        The report, with the size and the compressed size (with zlib, similar
+        to the gzip compression of web servers) of the downloaded files
+        (``"files"``), the size of each section of the WebAssembly module
+        (``"sections"``), the code size per code object (``"code_objects"``),
+        and the code size per function (``"symbols"``), largest first.
+    """
+    report = {'files': {}, 'sections': {}, 'code_objects': {}, 'symbols': {}}
+    for name in DOWNLOADED_FILES:
+        filename = os.path.join(directory, name)
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                content = f.read()
+            report['files'][name] = {'size': len(content),
+                                     'compressed': len(zlib.compress(content, 9))}
+    wasm_file = os.path.join(directory, 'wasm_module.wasm')
+    if not os.path.exists(wasm_file):
+        return report
+    sections, functions = wasm_sizes(wasm_file)
+    symbols = read_symbol_map(os.path.join(directory, 'wasm_module.js.symbols'))
+    report['sections'] = dict(sorted(sections.items(), key=lambda item: -item[1]))
+    function_sizes = {}
+    for index, size in functions.items():
+        name = symbols.get(index, f'function[{index}]')
+        function_sizes[name] = function_sizes.get(name, 0) + size
+    report['symbols'] = dict(sorted(function_sizes.items(), key=lambda item: -item[1]))
+    code_objects = dict.fromkeys(sorted(code_object_names, key=len, reverse=True), 0)
+    other = 0
+    for name, size in function_sizes.items():
+        # Use the longest matching name, e.g. for "synapses_pre" and "synapses_pre_push_spikes"
+        owner = next((codeobj for codeobj in code_objects if codeobj in name), None)
+        if owner is None:
+            other += size
+        else:
+            code_objects[owner] += size
+    code_objects['other'] = other
+    report['code_objects'] = dict(sorted(code_objects.items(), key=lambda item: -item[1]))
+    return report
+
+
+def format_size_report(report, entries=10):
+    """
+    Format a size report as text.
+
+    Parameters
+    ----------
+    report : dict
+        The report, as returned by `size_report`.
+    entries : int, optional
+        The number of code objects and functions to list. Default is 10.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    str
+        The formatted report.
+    """
+    lines = ['Size of the generated files (compressed size in parentheses):']
+    for name, sizes in report['files'].items():
+        lines.append(f"  {name:40s} {sizes['size'] / 1024:10.1f} kB "
+                     f"({sizes['compressed'] / 1024:.1f} kB)")
+    for title, key in (('Largest sections of wasm_module.wasm:', 'sections'),
+                       ('Code size per code object:', 'code_objects'),
+                       ('Largest functions:', 'symbols')):
+        if report[key]:
+            lines.append(title)
+            for name, size in list(report[key].items())[:entries]:
+                lines.append(f'  {name[:40]:40s} {size / 1024:10.1f} kB')
+    return '\n'.join(lines)
@@ -1,15 +1,26 @@
 class BrianSimulation {
-    constructor(result_plots, progress, run_button) {
+    constructor(result_plots, progress, run_button, stop_button) {
         this.worker = new Worker('worker.js');
         this.result_plots = (typeof result_plots !== "undefined") ? result_plots : [];
         this.plot_funcs = [];
         this.progress = (typeof progress !== "undefined") ? progress : {type: 'bar', bar_id: 'brian_progress_bar', text_id: 'brian_progress_text'};
         this.run_button = (typeof run_button !== "undefined") ? run_button : "brian_run_button";
-
+        this.stop_button = (typeof stop_button !== "undefined") ? stop_button : "brian_stop_button";
+        // Flag shared with the worker to pause or cancel a running simulation
+        // (see check_simulation_control in pre.js). SharedArrayBuffer is only
+        // available on cross-origin isolated pages.
+        this.control = null;
+        if (typeof SharedArrayBuffer !== "undefined" && self.crossOriginIsolated) {
+            this.control = new Int32Array(new SharedArrayBuffer(4));
+            this.worker.postMessage({type: 'control', buffer: this.control.buffer});
+        }
     }
 
     init() {
         this.run_button = document.getElementById(this.run_button);
+        this.stop_button = document.getElementById(this.stop_button);
+        if (this.stop_button)
+            this.stop_button.disabled = true;
         this.progress_bar = document.getElementById(this.progress.bar_id);
         this.progress_text = document.getElementById(this.progress.text_id);
         // Progress reports
@@ -53,6 +64,29 @@ class BrianSimulation {
                     Plotly.react(canvas, [spikes], layout);
                 };
                 this.plot_funcs.push(plot);
+            } else if (result_plot.type === 'profiling') {
+                // Share of the time spent in each code object (for runs with profile=True)
+                let plot = (event) => {
+                    const profiling = event.data.profiling;
+                    if (!profiling)
+                        return;
+                    const entries = profiling.slice().reverse();  // longest at the top
+                    const bars = {
+                        x: entries.map(entry => entry.share * 100),
+                        y: entries.map(entry => entry.name),
+                        text: entries.map(entry => `${(entry.time * 1000).toFixed(1)} ms, ${entry.calls} calls`),
+                        orientation: 'h',
+                        type: 'bar'
+                    };
+                    const layout = {
+                        title: {text: 'Time per code object'},
+                        xaxis: {title: {text: 'Share of the total time (%)'}},
+                        margin: {l: 250}
+                    };
+                    let canvas = (typeof result_plot.canvas !== "undefined") ? result_plot.canvas : "brian_profiling";
+                    Plotly.react(canvas, [bars], layout);
+                };
+                this.plot_funcs.push(plot);
             } else if (result_plot.type === 'custom') {
                 this.plot_funcs.push(result_plot.func);
             } else {
@@ -61,34 +95,238 @@ class BrianSimulation {
         });
 
         // Trigger report and plots by worker messages
-        this.worker.onmessage = (e) => {
+        this.handle_message = (e) => {
             if (e.data.type === 'results') {
                 this.plot_funcs.forEach(plot => {
                     plot(e);
                 });
-                if (this.run_button)
-                    this.run_button.disabled = false;
+                this.set_running(false);
             }
             else if (e.data.type == 'progress') {
                 if (this.report)
                     this.report(e);
+            } else if (e.data.type === 'spikes') {
+                this.onSpikes(e.data);
+            } else if (e.data.type === 'monitor') {
+                this.onMonitorData(e.data);
+            } else if (e.data.type === 'module') {
+                // handled by compileModule
+            } else if (e.data.type === 'error') {
+                console.error('Simulation failed: ' + e.data.message);
+                this.set_running(false);
             } else {
                 console.log('Received unknown message type');
                 console.log(e);
             }
         }
+        this.worker.onmessage = this.handle_message;
+    }
+
+    set_running(running) {
+        this.running = running;
+        if (this.run_button)
+            this.run_button.disabled = running;
+        if (this.stop_button)
+            this.stop_button.disabled = !running;
+        if (running && this.control)
+            Atomics.store(this.control, 0, 0);
+    }
+
+    pause() {
+        // Pause the running simulation, until resume or cancel is called
+        if (this.control === null) {
+            console.warn('Pausing a simulation requires a cross-origin isolated page');
+            return;
+        }
+        Atomics.store(this.control, 0, 1);
+    }
+
+    resume() {
+        // Resume a paused simulation
+        if (this.control === null)
+            return;
+        Atomics.store(this.control, 0, 0);
+        Atomics.notify(this.control, 0);
+    }
+
+    cancel() {
+        // Stop the running (or paused) simulation. The results recorded so far
+        // are sent to the plot functions as usual, with event.data.cancelled
+        // set. Without a shared flag, the worker is terminated and replaced,
+        // and the partial results are lost.
+        if (!this.running)
+            return;
+        if (this.control !== null) {
+            Atomics.store(this.control, 0, 2);
+            Atomics.notify(this.control, 0);
+            return;
+        }
+        this.worker.terminate();
+        this.worker = new Worker('worker.js');
+        if (this.handle_message)
+            this.worker.onmessage = this.handle_message;
+        this.compiled_module = undefined;
+        this.set_running(false);
+    }
+
+    onSpikes(chunk) {
+        // Called for each chunk of spikes sent by stream_spike, with the neuron
+        // indices in chunk.i (Int32Array) and the spike times in chunk.t
+        // (Float64Array). Override this method to process the spikes.
+    }
+
+    onMonitorData(chunk) {
+        // Called for each chunk of data sent by a monitor that has been
+        // registered with device.stream_monitor. chunk.owner is the name of
+        // the monitor, chunk.data has the newly recorded values for each
+        // variable, starting at index chunk.start of the full recording.
+        // Override this method to process the data.
+    }
+
+    onSweepResult(index, params, results) {
+        // Called by runSweep for each parameter set as soon as its simulation
+        // has finished. Override this method to process the results.
+    }
+
+    compileModule() {
+        // Get the WebAssembly module compiled by the main worker (from the
+        // browser cache, if enabled), so that it can be shared with all
+        // workers of the pool
+        if (this.compiled_module === undefined) {
+            this.compiled_module = new Promise(resolve => {
+                const listener = (e) => {
+                    if (e.data.type === 'module') {
+                        this.worker.removeEventListener('message', listener);
+                        resolve(e.data.module);
+                    }
+                };
+                this.worker.addEventListener('message', listener);
+                this.worker.postMessage({type: 'get_module'});
+            });
+        }
+        return this.compiled_module;
     }
 
-    run(data) {
-        // disable run button
+    runSweep(paramList, options) {
+        // Run the simulation for each parameter set in paramList, in parallel
+        // on a pool of workers. Returns a promise for the list of results (in
+        // the order of paramList); each result is also passed to
+        // options.onResult(index, params, results) (by default, the
+        // onSweepResult method) as soon as it is available. With options.seed,
+        // all simulations use the same seed for their random numbers.
+        options = (typeof options !== "undefined") ? options : {};
+        const concurrency = Math.max(1, Math.min(paramList.length,
+            options.concurrency || navigator.hardwareConcurrency || 4));
+        const on_result = options.onResult || ((index, params, results) => this.onSweepResult(index, params, results));
+        // The workers of the pool are shared by all sweeps
+        if (this.sweep_running)
+            return Promise.reject(new Error('A parameter sweep is already running.'));
+        this.sweep_running = true;
+        if (this.pool === undefined)
+            this.pool = [];
         if (this.run_button)
             this.run_button.disabled = true;
+        if (this.progress_bar)
+            this.progress_bar.value = 0;
+        const sweep = this.compileModule().then(module => new Promise((resolve, reject) => {
+            while (this.pool.length < concurrency) {
+                const worker = new Worker('worker.js', {name: 'brian_pool'});
+                worker.postMessage({type: 'init', module: module});
+                this.pool.push(worker);
+            }
+            const results = new Array(paramList.length);
+            let next = 0;
+            let finished = 0;
+            let failed = false;
+            const done = () => {
+                this.sweep_running = false;
+                if (this.run_button)
+                    this.run_button.disabled = false;
+                resolve(results);
+            };
+            const fail = (error) => {
+                if (failed)
+                    return;
+                // Do not start the remaining simulations, and stop the ones
+                // that are still running, so that a later sweep starts with
+                // idle workers
+                failed = true;
+                this.pool.forEach(worker => worker.terminate());
+                this.pool = [];
+                this.sweep_running = false;
+                if (this.run_button)
+                    this.run_button.disabled = false;
+                reject(error);
+            };
+            const start = (worker) => {
+                if (failed || next >= paramList.length)
+                    return;
+                const index = next++;
+                worker.onmessage = (e) => {
+                    // Ignore replies that do not belong to the current run
+                    if (failed || e.data.id !== index)
+                        return;
+                    if (e.data.type === 'results') {
+                        results[index] = e.data.results;
+                        finished++;
+                        if (this.progress_bar)
+                            this.progress_bar.value = finished / paramList.length;
+                        on_result(index, paramList[index], e.data.results);
+                        if (finished === paramList.length)
+                            done();
+                        else
+                            start(worker);
+                    } else if (e.data.type === 'error') {
+                        fail(new Error(`Simulation ${index} failed: ${e.data.message}`));
+                    }
+                };
+                worker.onerror = fail;
+                worker.postMessage({type: 'run', args: paramList[index], id: index, seed: options.seed});
+            };
+            if (paramList.length === 0)
+                done();
+            this.pool.slice(0, concurrency).forEach(start);
+        }));
+        // E.g. if the module could not be compiled
+        sweep.catch(() => {
+            this.sweep_running = false;
+            if (this.run_button)
+                this.run_button.disabled = false;
+        });
+        return sweep;
+    }
+
+    continue(duration) {
+        // Continue the last simulation for another duration (in seconds),
+        // starting from its state at the end of the previous run instead of
+        // running it again from the start. The results (passed to the plot
+        // functions as for run) contain all values recorded since the start.
+        this.set_running(true);
+        if (this.progress.type == 'bar')
+            document.getElementById(this.progress.bar_id).removeAttribute('value');
+        this.worker.postMessage({type: 'continue', duration: duration});
+    }
+
+    reset() {
+        // Discard the state of the last simulation (the next call of run
+        // starts a new simulation in any case)
+        this.worker.postMessage({type: 'reset'});
+    }
+
+    run(data, options) {
+        // Run the simulation, with the variables set in data. With
+        // options.seed (a non-negative integer), the random number generators
+        // are seeded with this value (instead of the seed set in the script),
+        // so that the results can be reproduced.
+        options = (typeof options !== "undefined") ? options : {};
+        // disable run button, enable stop button
+        this.set_running(true);
         // set progress bar to undetermined state
         if (this.progress.type == 'bar')
             document.getElementById(this.progress.bar_id).removeAttribute('value');
         // send message to worker
         if (data === undefined)
             data = {};
-        this.worker.postMessage(data);
+        this.worker.postMessage({type: 'run', args: data, seed: options.seed});
     }
 }
\ No newline at end of file
@@ -0,0 +1,246 @@
+{% macro cpp_file() %}
+
+#include "network.h"
+#include "objects.h"
+#include<stdlib.h>
+#include<iostream>
+#include <ctime>
+#include<utility>
+#include <emscripten.h>
+
+{{ openmp_pragma('include') }}
+
+#define Clock_epsilon 1e-14
+// Wall-clock time (in seconds) between two checks whether JavaScript asked to
+// pause or cancel the run
+#define Control_check_interval 0.01
+
+double Network::_last_run_time = 0.0;
+double Network::_last_run_completed_fraction = 0.0;
+bool Network::_globally_stopped = false;
+bool Network::_globally_running = false;
+
+Network::Network()
+{
+    t = 0.0;
+}
+
+void Network::clear()
+{
+    objects.clear();
+}
+
+void Network::add(Clock* clock, codeobj_func func)
+{
+#if defined(_MSC_VER) && (_MSC_VER>=1700)
+    objects.push_back(std::make_pair(std::move(clock), std::move(func)));
+#else
+    objects.push_back(std::make_pair(clock, func));
+#endif
+}
+
+void Network::run(const double duration, void (*report_func)(const double, const double, const double, const double), const double report_period)
+{
+    // After a cancelled run (see check_simulation_control in pre.js), the
+    // remaining runs of the script are skipped
+    if (EM_ASM_INT({ return Module['brian_cancelled'] ? 1 : 0; }))
+        return;
+    {% if openmp_pragma('with_openmp') %}
+    double start;
+    {% else %}
+    std::clock_t start, current;
+    {% endif %}
+    const double t_start = t;
+    const double t_end = t + duration;
+    double next_report_time = report_period;
+    // compute the set of clocks
+    compute_clocks();
+    // set interval for all clocks
+
+    for(std::set<Clock*>::iterator i=clocks.begin(); i!=clocks.end(); i++)
+        (*i)->set_interval(t, t_end);
+
+    {% if openmp_pragma('with_openmp') %}
+    start = omp_get_wtime();
+    {% else %}
+    start = std::clock();
+    {% endif %}
+    if (report_func)
+    {
+        report_func(0.0, 0.0, t_start, duration);
+    }
+
+    Clock* clock = next_clocks();
+    double elapsed_realtime;
+    double next_control_check = Control_check_interval;
+    bool did_break_early = false;
+
+    Network::_globally_running = true;
+    Network::_globally_stopped = false;
+    while(clock && clock->running() && !Network::_globally_stopped)
+    {
+        t = clock->t[0];
+
+        for(size_t i=0; i<objects.size(); i++)
+        {
+            if (report_func)
+            {
+                {% if openmp_pragma('with_openmp') %}
+                const double elapsed = omp_get_wtime() - start;
+                {% else %}
+                current = std::clock();
+                const double elapsed = ((double)(current - start) / CLOCKS_PER_SEC);
+                {% endif %}
+                if (elapsed > next_report_time)
+                {
+                    report_func(elapsed, (clock->t[0]-t_start)/duration, t_start, duration);
+                    next_report_time += report_period;
+                }
+            }
+            Clock *obj_clock = objects[i].first;
+            // Only execute the object if it uses the right clock for this step
+            if (curclocks.find(obj_clock) != curclocks.end())
+            {
+                codeobj_func func = objects[i].second;
+                if (func)  // code objects can be NULL in cases where we store just the clock
+                    func();
+            }
+        }
+        for(std::set<Clock*>::iterator i=curclocks.begin(); i!=curclocks.end(); i++)
+            (*i)->tick();
+        clock = next_clocks();
+
+        // Send the buffered spikes of a chunk that is complete, even if no
+        // further spike arrives to trigger it
+        brian::_spike_stream.check(clock->t[0]);
+
+        {% if openmp_pragma('with_openmp') %}
+        elapsed_realtime = omp_get_wtime() - start;
+        {% else %}
+        current = std::clock();
+        elapsed_realtime = (double)(current - start)/({{ openmp_pragma('get_num_threads') }} * CLOCKS_PER_SEC);
+        {% endif %}
+
+        // Pausing blocks in check_simulation_control (see pre.js), cancelling
+        // stops the run like a keyboard interrupt, i.e. the results recorded
+        // so far are still written
+        if (elapsed_realtime > next_control_check)
+        {
+            const double paused = EM_ASM_DOUBLE({ return check_simulation_control(); });
+            if (paused > 0)
+            {
+                // The time spent paused does not count as run time
+                {% if openmp_pragma('with_openmp') %}
+                start += paused;
+                {% else %}
+                start += (std::clock_t)(paused * {{ openmp_pragma('get_num_threads') }} * CLOCKS_PER_SEC);
+                {% endif %}
+                elapsed_realtime -= paused;
+            }
+            if (EM_ASM_INT({ return Module['brian_cancelled'] ? 1 : 0; }))
+                Network::_globally_stopped = true;
+            next_control_check = elapsed_realtime + Control_check_interval;
+        }
+
+        {% if maximum_run_time is not none %}
+        if(elapsed_realtime>{{maximum_run_time}})
+        {
+            did_break_early = true;
+            break;
+        }
+        {% endif %}
+
+    }
+    Network::_globally_running = false;
+
+    if(!did_break_early && !Network::_globally_stopped)
+        t = t_end;
+    else
+        t = clock->t[0];
+
+    _last_run_time = elapsed_realtime;
+    if(duration>0)
+    {
+        _last_run_completed_fraction = (t-t_start)/duration;
+    } else {
+        _last_run_completed_fraction = 1.0;
+    }
+    if (report_func)
+    {
+        report_func(elapsed_realtime, _last_run_completed_fraction, t_start, duration);
+    }
+}
+
+void Network::compute_clocks()
+{
+    clocks.clear();
+    for(int i=0; i<objects.size(); i++)
+    {
+        Clock *clock = objects[i].first;
+        clocks.insert(clock);
+    }
+}
+
+Clock* Network::next_clocks()
+{
+    if (clocks.empty())
+        return NULL;
+    // find minclock, clock with smallest t value
+    Clock *minclock = *clocks.begin();
+
+    for(std::set<Clock*>::iterator i=clocks.begin(); i!=clocks.end(); i++)
+    {
+        Clock *clock = *i;
+        if(clock->t[0]<minclock->t[0])
+            minclock = clock;
+    }
+    // find set of equal clocks
+    curclocks.clear();
+
+    double t = minclock->t[0];
+    for(std::set<Clock*>::iterator i=clocks.begin(); i!=clocks.end(); i++)
+    {
+        Clock *clock = *i;
+        double s = clock->t[0];
+        if(s==t || fabs(s-t)<=Clock_epsilon)
+            curclocks.insert(clock);
+    }
+    return minclock;
+}
+
+{% endmacro %}
+
+{% macro h_file() %}
+
+#ifndef _BRIAN_NETWORK_H
+#define _BRIAN_NETWORK_H
+
+#include<vector>
+#include<utility>
+#include<set>
+#include "brianlib/clocks.h"
+
+typedef void (*codeobj_func)();
+
+class Network
+{
+    std::set<Clock*> clocks, curclocks;
+    void compute_clocks();
+    Clock* next_clocks();
+public:
+    std::vector< std::pair< Clock*, codeobj_func > > objects;
+    double t;
+    static double _last_run_time;
+    static double _last_run_completed_fraction;
+    static bool _globally_stopped;
+    static bool _globally_running;
+
+    Network();
+    void clear();
+    void add(Clock *clock, codeobj_func func);
+    void run(const double duration, void (*report_func)(const double, const double, const double, const double), const double report_period);
+};
+
+#endif
+
+{% endmacro %}
@@ -0,0 +1,100 @@
+// Run a generated brian2wasm project in Node.js instead of a browser, by
+// emulating the web worker environment that worker.js expects.
+//
+// Usage: node node_runner.js <project directory> [--results <directory>] [--seed <seed>] [name=value ...]
+//
+// The name=value arguments are passed on to the simulation, like the values
+// sent by BrianSimulation.run. With --results, the result files are written
+// to the given directory, in the same format as for the C++ standalone mode.
+// With --seed, the random number generators are seeded with the given value.
+// For simulations run with profile=True, the profiling information sent by the
+// worker is written to profiling.json in the results directory as well.
+// The last line of the output is a JSON object with the wall-clock time of the
+// simulation (in ms, without downloading and compiling the WebAssembly module),
+// the number of simulated time steps, the simulated time (in seconds), the time
+// for compiling the WebAssembly module (in ms), and the durations of the phases
+// of the run as measured by the worker (instantiate, run, transfer; in ms).
+const fs = require('fs');
+const path = require('path');
+const url = require('url');
+const vm = require('vm');
+
+const argv = process.argv.slice(2);
+const directory = path.resolve(argv.shift() || '.');
+let results_directory = null;
+let seed = undefined;
+const args = {};
+while (argv.length) {
+    const arg = argv.shift();
+    if (arg === '--results') {
+        results_directory = path.resolve(argv.shift());
+    } else if (arg === '--seed') {
+        seed = Number(argv.shift());
+    } else {
+        const [name, value] = arg.split(/=(.*)/s);
+        args[name] = value;
+    }
+}
+
+function read_file(name) {
+    // The worker fetches some files with absolute (file://) URLs
+    if (String(name).startsWith('file:'))
+        return fs.readFileSync(url.fileURLToPath(String(name)));
+    return fs.readFileSync(path.join(directory, String(name)));
+}
+
+globalThis.self = globalThis;
+globalThis.location = {href: 'file://' + path.join(directory, 'worker.js')};
+globalThis.importScripts = (...names) => {
+    for (const name of names) {
+        vm.runInThisContext(read_file(name).toString(), {filename: name});
+    }
+};
+globalThis.fetch = async (name) => {
+    const content_type = String(name).endsWith('.wasm') ? 'application/wasm' : 'application/octet-stream';
+    return new Response(read_file(name), {headers: {'Content-Type': content_type}});
+};
+
+let start = null;
+globalThis.postMessage = (message) => {
+    // Progress reports are also printed to stdout by the simulation itself
+    if (message.type === 'error') {
+        // The error itself has already been printed by the worker
+        process.exit(1);
+    }
+    if (message.type === 'results') {
+        const elapsed = performance.now() - start;
+        if (results_directory !== null) {
+            fs.mkdirSync(results_directory, {recursive: true});
+            for (const [name, data] of Object.entries(message.files)) {
+                // Replace the file instead of overwriting it, since Python may
+                // still have the file of an earlier run memory-mapped
+                const filename = path.join(results_directory, name);
+                fs.writeFileSync(filename + '.tmp', data);
+                fs.renameSync(filename + '.tmp', filename);
+            }
+            if (message.profiling)
+                fs.writeFileSync(path.join(results_directory, 'profiling.json'),
+                                 JSON.stringify(message.profiling, null, 2));
+        }
+        const clock = message.results['defaultclock'];
+        console.log(JSON.stringify({time: elapsed, steps: Number(clock['timestep'][0]),
+                                    simulated: clock['t'][0], compile: compile_time,
+                                    timings: message.timings}));
+    }
+};
+
+process.on('unhandledRejection', error => {
+    console.error(error);
+    process.exit(1);
+});
+
+importScripts('worker.js');
+const compile_start = performance.now();
+let compile_time = null;
+compile_wasm_module().then(() => {
+    compile_time = performance.now() - compile_start;
+    start = performance.now();
+    self.onmessage({data: {type: 'run', args: args, write_files: results_directory !== null,
+                             seed: seed}});
+});
@@ -25,6 +25,10 @@ set_variable_from_value<char>(name, {{array_name}}, var_size, (char)atoi(s_value
 #include<iostream>
 #include<fstream>
 #include <emscripten.h>
+{% if compress_static_arrays %}
+#include <iterator>
+#include <zlib.h>
+{% endif %}
 
 namespace brian {
 
@@ -34,6 +38,40 @@ std::string results_dir = "results/";  // can be overwritten by --results_dir co
 // the distribution is stateless.
 std::vector< RandomGenerator > _random_generators;
 
+// Spikes that are streamed to JavaScript in chunks
+SpikeStream _spike_stream({{spike_stream_interval}}, {{spike_stream_wallclock_interval}});
+
+void SpikeStream::push(int32_t i, double t) {
+    if (indices.empty()) {
+        chunk_start_t = t;
+        if (wallclock_interval > 0)
+            chunk_start_wallclock = emscripten_get_now();
+    }
+    indices.push_back(i);
+    times.push_back(t);
+    check(t);
+}
+
+void SpikeStream::check(double t) {
+    if (indices.empty())
+        return;
+    if ((interval > 0 && t - chunk_start_t >= interval) ||
+        (wallclock_interval > 0 && emscripten_get_now() - chunk_start_wallclock >= wallclock_interval))
+        flush();
+}
+
+void SpikeStream::flush() {
+    if (indices.empty())
+        return;
+    EM_ASM({
+        const indices = HEAP32.slice($0 >> 2, ($0 >> 2) + $2);
+        const times = HEAPF64.slice($1 >> 3, ($1 >> 3) + $2);
+        postMessage({type: 'spikes', i: indices, t: times}, [indices.buffer, times.buffer]);
+    }, indices.data(), times.data(), indices.size());
+    indices.clear();
+    times.clear();
+}
+
 //////////////// networks /////////////////
 {% for net in networks | sort(attribute='name') %}
 Network {{net.name}};
@@ -133,6 +171,59 @@ void set_variable_by_name(std::string name, std::string s_value) {
     exit(1);
 }
 
+//////////////// set arrays from JavaScript ///////
+std::unordered_map<std::string, std::tuple<size_t, std::string, void*>> array_meta_data;
+
+void _update_array_meta_data() {
+    // non-dynamic arrays
+    {% for var, varname in array_specs | dictsort(by='value') %}
+    {% if not var in dynamic_array_specs and not var.read_only %}
+    array_meta_data["{{var.owner.name}}.{{var.name}}"] = std::make_tuple((size_t){{var.size}}, std::string("{{c_data_type(var.dtype)}}"), (void*){{get_array_name(var)}});
+    {% endif %}
+    {% endfor %}
+    // dynamic arrays (1d), their size and location can change
+    {% for var, varname in dynamic_array_specs | dictsort(by='value') %}
+    {% if not var.read_only %}
+    array_meta_data["{{var.owner.name}}.{{var.name}}"] = std::make_tuple({{get_array_name(var, False)}}.size(), std::string("{{c_data_type(var.dtype)}}"), (void*){{get_array_name(var, False)}}.data());
+    {% endif %}
+    {% endfor %}
+    {% for var, varname in timed_arrays | dictsort(by='value') %}
+    array_meta_data["{{varname}}.values"] = std::make_tuple((size_t){{var.values.size}}, std::string("{{c_data_type(var.values.dtype)}}"), (void*){{varname}}_values);
+    {% endfor %}
+}
+
+// Seed the random number generators with the seed set from JavaScript
+// (Module['brian_seed']), using seed + i for the i-th generator as Brian's seed
+// function. Returns whether a seed has been set.
+bool _seed_from_javascript() {
+    const double seed = EM_ASM_DOUBLE({
+        const seed = Module['brian_seed'];
+        return (Number.isInteger(seed) && seed >= 0) ? seed : -1;
+    });
+    if (seed < 0)
+        return false;
+    for (size_t i=0; i<_random_generators.size(); i++)
+        _random_generators[i].seed((unsigned long)seed + i);
+    return true;
+}
+
+// Copy the values in Module['brian_typed_args'] (numbers or typed arrays)
+// directly into the arrays, without converting them to strings or files
+void _set_from_javascript() {
+    if (!EM_ASM_INT({ return typed_argument_count(); }))
+        return;
+    _update_array_meta_data();
+    for (const auto& entry : array_meta_data) {
+        EM_ASM({
+            register_array(UTF8ToString($0), $1, $2, UTF8ToString($3));
+        }, entry.first.c_str(), std::get<2>(entry.second), std::get<0>(entry.second),
+           std::get<1>(entry.second).c_str());
+    }
+    EM_ASM({
+        copy_typed_arguments();
+    });
+}
+
 //////////////// arrays ///////////////////
 {% for var, varname in array_specs | dictsort(by='value') %}
 {% if not var in dynamic_array_specs %}
@@ -179,6 +270,7 @@ Clock {{clock.name}};  // attributes will be set in run.cpp
 // Profiling information for each code object
 {% for codeobj in profiled_codeobjects | sort %}
 double {{codeobj}}_profiling_info = 0.0;
+long {{codeobj}}_profiling_calls = 0;
 {% endfor %}
 {% endif %}
 }
@@ -224,6 +316,7 @@ void _init_arrays()
     std::random_device rd;
     for (int i=0; i<{{openmp_pragma('get_num_threads')}}; i++)
         _random_generators.push_back(RandomGenerator());
+    _seed_from_javascript();
 }
 
 void _load_arrays()
@@ -232,14 +325,29 @@ void _load_arrays()
 
 	{% for (name, dtype_spec, N, filename) in static_array_specs | sort %}
 	ifstream f{{name}};
+	{% if compress_static_arrays %}
+	f{{name}}.open("static_arrays/{{name}}.z", ios::in | ios::binary);
+	{% else %}
 	f{{name}}.open("static_arrays/{{name}}", ios::in | ios::binary);
+	{% endif %}
 	if(f{{name}}.is_open())
 	{
 	    {% if name in dynamic_array_specs.values() %}
-	    f{{name}}.read(reinterpret_cast<char*>(&{{name}}[0]), {{N}}*sizeof({{dtype_spec}}));
+	    char* _target = reinterpret_cast<char*>(&{{name}}[0]);
 	    {% else %}
-		f{{name}}.read(reinterpret_cast<char*>({{name}}), {{N}}*sizeof({{dtype_spec}}));
-		{% endif %}
+	    char* _target = reinterpret_cast<char*>({{name}});
+	    {% endif %}
+	    {% if compress_static_arrays %}
+	    // Decompress directly into the array
+	    std::vector<char> _compressed((std::istreambuf_iterator<char>(f{{name}})),
+	                                  std::istreambuf_iterator<char>());
+	    uLongf _size = {{N}}*sizeof({{dtype_spec}});
+	    if (uncompress(reinterpret_cast<Bytef*>(_target), &_size,
+	                   reinterpret_cast<const Bytef*>(_compressed.data()), _compressed.size()) != Z_OK)
+	        std::cout << "Error decompressing static array {{name}}." << endl;
+	    {% else %}
+	    f{{name}}.read(_target, {{N}}*sizeof({{dtype_spec}}));
+	    {% endif %}
 	} else
 	{
 		std::cout << "Error opening static array {{name}}." << endl;
@@ -251,29 +359,42 @@ void _write_arrays()
 {
 	using namespace brian;
 
-    EM_ASM({
-        // Make the results directory if it doesn't exist
-		if (!FS.analyzePath(UTF8ToString($0)).exists) {
-        	FS.mkdir(UTF8ToString($0));
-		}
-    }, results_dir.c_str());
+    // Send the remaining buffered spikes
+    _spike_stream.flush();
+
+    // Results are handed to JavaScript directly from the heap, files in the
+    // results directory are only written if requested by the JavaScript side
+    const bool write_files = EM_ASM_INT({
+        return Module['brian_write_result_files'] ? 1 : 0;
+    });
+    if (write_files)
+    {
+        EM_ASM({
+            // Make the results directory if it doesn't exist
+            if (!FS.analyzePath(UTF8ToString($0)).exists) {
+                FS.mkdir(UTF8ToString($0));
+            }
+        }, results_dir.c_str());
+    }
 
 	{% for var, varname in array_specs | dictsort(by='value') %}
 	{% if not (var in dynamic_array_specs or var in dynamic_array_2d_specs) %}
 	{% if not transfer_results or var in transfer_results %}
-	ofstream outfile_{{varname}};
-	outfile_{{varname}}.open(results_dir + "{{get_array_filename(var)}}", ios::binary | ios::out);
-	if(outfile_{{varname}}.is_open())
-	{
-		outfile_{{varname}}.write(reinterpret_cast<char*>({{varname}}), {{var.size}}*sizeof({{get_array_name(var)}}[0]));
-		outfile_{{varname}}.close();
-		EM_ASM({
-			add_results('{{var.owner.name}}', '{{var.name}}', '{{c_data_type(var.dtype)}}', UTF8ToString($0) + '{{get_array_filename(var)}}', {{var.size}});
-		}, results_dir.c_str());
-
-	} else
+	EM_ASM({
+		add_results('{{var.owner.name}}', '{{var.name}}', '{{c_data_type(var.dtype)}}', $0, {{var.size}});
+	}, {{varname}});
+	if (write_files)
 	{
-		std::cout << "Error writing output file for {{varname}}." << endl;
+		ofstream outfile_{{varname}};
+		outfile_{{varname}}.open(results_dir + "{{get_array_filename(var)}}", ios::binary | ios::out);
+		if(outfile_{{varname}}.is_open())
+		{
+			outfile_{{varname}}.write(reinterpret_cast<char*>({{varname}}), {{var.size}}*sizeof({{get_array_name(var)}}[0]));
+			outfile_{{varname}}.close();
+		} else
+		{
+			std::cout << "Error writing output file for {{varname}}." << endl;
+		}
 	}
 	{% endif %}
 	{% endif %}
@@ -281,46 +402,66 @@ void _write_arrays()
 
 	{% for var, varname in dynamic_array_specs | dictsort(by='value') %}
 	{% if not transfer_results or var in transfer_results %}
-	ofstream outfile_{{varname}};
-	outfile_{{varname}}.open(results_dir + "{{get_array_filename(var)}}", ios::binary | ios::out);
-	if(outfile_{{varname}}.is_open())
-	{
-			outfile_{{varname}}.write(reinterpret_cast<char*>(&{{varname}}[0]), {{varname}}.size()*sizeof({{varname}}[0]));
-		    outfile_{{varname}}.close();
-			EM_ASM({
-				add_results('{{var.owner.name}}', '{{var.name}}', '{{c_data_type(var.dtype)}}', UTF8ToString($0) + '{{get_array_filename(var)}}', $1);
-			}, results_dir.c_str(), {{varname}}.size());
-	} else
+	EM_ASM({
+		add_results('{{var.owner.name}}', '{{var.name}}', '{{c_data_type(var.dtype)}}', $0, $1);
+	}, {{varname}}.data(), {{varname}}.size());
+	if (write_files)
 	{
-		std::cout << "Error writing output file for {{varname}}." << endl;
+		ofstream outfile_{{varname}};
+		outfile_{{varname}}.open(results_dir + "{{get_array_filename(var)}}", ios::binary | ios::out);
+		if(outfile_{{varname}}.is_open())
+		{
+			outfile_{{varname}}.write(reinterpret_cast<char*>({{varname}}.data()), {{varname}}.size()*sizeof({{c_data_type(var.dtype)}}));
+			outfile_{{varname}}.close();
+		} else
+		{
+			std::cout << "Error writing output file for {{varname}}." << endl;
+		}
 	}
 	{% endif %}
 	{% endfor %}
 
 	{% for var, varname in dynamic_array_2d_specs | dictsort(by='value') %}
 	{% if not transfer_results or var in transfer_results %}
-	ofstream outfile_{{varname}};
-	outfile_{{varname}}.open(results_dir + "{{get_array_filename(var)}}", ios::binary | ios::out);
-	if(outfile_{{varname}}.is_open())
 	{
-        for (int n=0; n<{{varname}}.n; n++)
-        {
-            if (! {{varname}}(n).empty())
-            {
-                outfile_{{varname}}.write(reinterpret_cast<char*>(&{{varname}}(n, 0)), {{varname}}.m*sizeof({{varname}}(0, 0)));
-            }
-        }
-        outfile_{{varname}}.close();
-
+		const int _n = {{varname}}.n;
+		const int _m = {{varname}}.m;
+		std::vector<{{c_data_type(var.dtype)}}> _flat_{{varname}} = _flatten_2d({{varname}}, 0, {{ 'true' if result_2d_layout == 'per_neuron' else 'false' }});
 		EM_ASM({
-				add_results('{{var.owner.name}}', '{{var.name}}', '{{c_data_type(var.dtype)}}', UTF8ToString($0) + '{{get_array_filename(var)}}', $1, $2);
-		}, results_dir.c_str(), {{varname}}.n, {{varname}}.m);
-	} else
-	{
-		std::cout << "Error writing output file for {{varname}}." << endl;
+			add_results('{{var.owner.name}}', '{{var.name}}', '{{c_data_type(var.dtype)}}', $0, $1, $2, '{{result_2d_layout}}');
+		}, _flat_{{varname}}.data(), _n, _m);
+		if (write_files)
+		{
+			ofstream outfile_{{varname}};
+			outfile_{{varname}}.open(results_dir + "{{get_array_filename(var)}}", ios::binary | ios::out);
+			if(outfile_{{varname}}.is_open())
+			{
+				for (int n=0; n<_n; n++)
+				{
+					if (! {{varname}}(n).empty())
+					{
+						outfile_{{varname}}.write(reinterpret_cast<char*>(&{{varname}}(n, 0)), _m*sizeof({{varname}}(0, 0)));
+					}
+				}
+				outfile_{{varname}}.close();
+			} else
+			{
+				std::cout << "Error writing output file for {{varname}}." << endl;
+			}
+		}
 	}
 	{% endif %}
 	{% endfor %}
+	{% if profiled_codeobjects is defined and profiled_codeobjects %}
+	// Send profiling info to JavaScript
+	{% for codeobj in profiled_codeobjects | sort %}
+	EM_ASM({
+		add_profiling_info(UTF8ToString($0), $1, $2);
+	}, "{{codeobj}}", {{codeobj}}_profiling_info, {{codeobj}}_profiling_calls);
+	{% endfor %}
+	{% endif %}
+	if (!write_files)
+		return;
     {% if profiled_codeobjects is defined and profiled_codeobjects %}
 	// Write profiling info to disk
 	ofstream outfile_profiling_info;
@@ -391,12 +532,102 @@ void _dealloc_arrays()
 #include "network.h"
 #include<random>
 #include<vector>
+#include<string>
+#include<tuple>
+#include<unordered_map>
 {{ openmp_pragma('include') }}
 
 namespace brian {
 
 extern std::string results_dir;
 
+{% if random_generator == 'xoshiro' %}
+// xoshiro256+ generators (https://prng.di.unimi.it/) with several independent
+// streams ("lanes") that are advanced together. Uniform and normal random
+// numbers are generated in batches into buffers, in loops over the lanes that
+// the compiler can vectorize.
+class RandomGenerator {
+    private:
+        static const int LANES = 4;
+        static const int BUFFER_SIZE = 256;  // a multiple of LANES
+        uint64_t state[4][LANES];
+        double uniform[BUFFER_SIZE];
+        double normal[BUFFER_SIZE];
+        int next_uniform = BUFFER_SIZE;
+        int next_normal = BUFFER_SIZE;
+
+        static inline uint64_t rotl(const uint64_t x, const int k) {
+            return (x << k) | (x >> (64 - k));
+        }
+        // Used to initialize the state from a single seed value
+        static inline uint64_t splitmix64(uint64_t &x) {
+            uint64_t z = (x += 0x9e3779b97f4a7c15ULL);
+            z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ULL;
+            z = (z ^ (z >> 27)) * 0x94d049bb133111ebULL;
+            return z ^ (z >> 31);
+        }
+        void seed_state(uint64_t x) {
+            for (int lane=0; lane<LANES; lane++)
+                for (int i=0; i<4; i++)
+                    state[i][lane] = splitmix64(x);
+            next_uniform = BUFFER_SIZE;
+            next_normal = BUFFER_SIZE;
+        }
+        // Fill a buffer with uniform random numbers in [0, 1), using the upper
+        // 53 bits of each 64 bit output
+        void fill_uniform(double *buffer) {
+            for (int i=0; i<BUFFER_SIZE; i+=LANES) {
+                for (int lane=0; lane<LANES; lane++) {
+                    const uint64_t result = state[0][lane] + state[3][lane];
+                    const uint64_t t = state[1][lane] << 17;
+                    state[2][lane] ^= state[0][lane];
+                    state[3][lane] ^= state[1][lane];
+                    state[1][lane] ^= state[2][lane];
+                    state[0][lane] ^= state[3][lane];
+                    state[2][lane] ^= t;
+                    state[3][lane] = rotl(state[3][lane], 45);
+                    buffer[i + lane] = (result >> 11) * 1.1102230246251565e-16;  // 2^-53
+                }
+            }
+        }
+        // Fill the buffer of normal random numbers with the Box-Muller
+        // transform of pairs of uniform numbers, which does not need the
+        // rejection loop of the polar method
+        void fill_normal() {
+            fill_uniform(normal);
+            for (int i=0; i<BUFFER_SIZE; i+=2) {
+                const double r = sqrt(-2.0*log(1.0 - normal[i]));  // 1 - u is in (0, 1]
+                const double phi = 6.283185307179586*normal[i + 1];
+                normal[i] = r*cos(phi);
+                normal[i + 1] = r*sin(phi);
+            }
+            next_normal = 0;
+        }
+    public:
+        RandomGenerator() {
+            seed();
+        }
+        void seed() {
+            std::random_device rd;
+            seed_state(((uint64_t)rd() << 32) | rd());
+        }
+        void seed(unsigned long seed) {
+            seed_state(seed);
+        }
+        double rand() {
+            if (next_uniform == BUFFER_SIZE) {
+                fill_uniform(uniform);
+                next_uniform = 0;
+            }
+            return uniform[next_uniform++];
+        }
+        double randn() {
+            if (next_normal == BUFFER_SIZE)
+                fill_normal();
+            return normal[next_normal++];
+        }
+};
+{% else %}
 class RandomGenerator {
     private:
         std::mt19937 gen;
@@ -447,11 +678,61 @@ class RandomGenerator {
             }
         }
 };
+{% endif %}
 
 
 // In OpenMP we need one state per thread
 extern std::vector< RandomGenerator > _random_generators;
 
+// Collects spikes (see brian2wasm.functions.stream_spike) and sends them to
+// JavaScript as a single message per chunk. A chunk is sent when it spans more
+// than `interval` seconds of simulated time or `wallclock_interval` ms of
+// wall-clock time (a non-positive value disables the respective criterion),
+// and at the end of the simulation. Since spikes might stop arriving, the
+// network also calls `check` after every time step.
+class SpikeStream {
+    private:
+        std::vector<int32_t> indices;
+        std::vector<double> times;
+        double chunk_start_t = 0.0;
+        double chunk_start_wallclock = 0.0;
+    public:
+        double interval;
+        double wallclock_interval;
+        SpikeStream(double interval, double wallclock_interval) :
+            interval(interval), wallclock_interval(wallclock_interval) {}
+        void push(int32_t i, double t);
+        void check(double t);
+        void flush();
+};
+
+extern SpikeStream _spike_stream;
+
+// Copy the rows [start, n) of a 2d dynamic array into a contiguous buffer.
+// With per_neuron=true, the values of each column (i.e. each recorded neuron)
+// are stored contiguously, otherwise the buffer uses Brian's row-major layout.
+template<class T> std::vector<T> _flatten_2d(DynamicArray2D<T> &array, int start, bool per_neuron)
+{
+    const int n = array.n - start;
+    const int m = array.m;
+    std::vector<T> flat((size_t)n*m);
+    for (int row=0; row<n; row++)
+    {
+        std::vector<T> &values = array(start + row);
+        if (values.empty())
+            continue;
+        if (per_neuron)
+        {
+            for (int col=0; col<m; col++)
+                flat[(size_t)col*n + row] = values[col];
+        } else
+        {
+            std::copy(values.begin(), values.end(), flat.begin() + (size_t)row*m);
+        }
+    }
+    return flat;
+}
+
 //////////////// clocks ///////////////////
 {% for clock in clocks | sort(attribute='name') %}
 extern Clock {{clock.name}};
@@ -463,8 +744,11 @@ extern Network {{net.name}};
 {% endfor %}
 
 void set_variable_by_name(std::string, std::string);
+void _set_from_javascript();
+bool _seed_from_javascript();
 
-extern std::map<std::string, std::tuple<size_t, std::string, void*>> array_meta_data;
+// Size, data type, and pointer of all arrays that can be set from JavaScript
+extern std::unordered_map<std::string, std::tuple<size_t, std::string, void*>> array_meta_data;
 
 //////////////// dynamic arrays ///////////
 {% for var, varname in dynamic_array_specs | dictsort(by='value') %}
@@ -505,6 +789,7 @@ extern SynapticPathway {{path.name}};
 // Profiling information for each code object
 {% for codeobj in profiled_codeobjects | sort %}
 extern double {{codeobj}}_profiling_info;
+extern long {{codeobj}}_profiling_calls;
 {% endfor %}
 {% endif %}
 }
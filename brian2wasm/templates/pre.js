@@ -1,41 +1,186 @@
 var brian_results = {};
 Module['brian_results'] = brian_results;
 
-function add_results(owner, varname, dtype, array_filename, n1, n2 = 0) {
-    let data = null;
-    let array_class = null;
+function typed_array_class(dtype) {
     if (dtype == 'double') {
-       array_class = Float64Array;
+        return Float64Array;
     } else if (dtype == 'float') {
-        array_class = Float32Array;
+        return Float32Array;
     } else if (dtype == 'int32_t') {
-        array_class = Int32Array;
+        return Int32Array;
     } else if (dtype == 'int64_t') {
-        array_class = BigInt64Array;
+        return BigInt64Array;
     } else if (dtype == 'char') {
-        array_class = Uint8Array;
-    } else {
-        console.log('Unknown dtype: ' + dtype);
-        return;
+        return Uint8Array;
     }
+    console.log('Unknown dtype: ' + dtype);
+    return null;
+}
+
+function result_array(dtype, ptr, n1, n2 = 0, layout = 'per_neuron') {
+    let data = null;
+    const array_class = typed_array_class(dtype);
+    if (array_class === null)
+        return null;
+    // Copy the data out of the WASM heap (the only copy that is made, the
+    // resulting buffer can be transferred to the main thread)
+    const size = (n2 === 0) ? n1 : n1*n2;
+    const flat_data = new array_class(HEAPU8.buffer, ptr, size).slice();
     if (n2 === 0) {
-        data = new array_class(FS.readFile(array_filename).buffer);
+        data = flat_data;
+    } else if (layout === 'flat') {
+        // n1 time steps x n2 neurons, as in Brian
+        data = {data: flat_data, shape: [n1, n2], strides: [n2, 1]};
     } else {
-        const flat_data = new array_class(FS.readFile(array_filename).buffer);
+        // The values for each neuron are stored contiguously, the arrays for
+        // the individual neurons are views on the same buffer
         data = [];
         for (let i=0; i < n2; i++) {
-            let neuron_values = [];
-            for (let j=0; j < n1; j++) {
-                neuron_values.push(flat_data[j*n2 + i]);
-            }
-            data.push(new array_class(neuron_values));
+            data.push(flat_data.subarray(i*n1, (i+1)*n1));
         }
     }
+    return data;
+}
+
+// Time (in ms) spent copying results out of the WebAssembly memory
+Module['brian_transfer_time'] = 0;
+
+function add_results(owner, varname, dtype, ptr, n1, n2 = 0, layout = 'per_neuron') {
+    const start = performance.now();
+    const data = result_array(dtype, ptr, n1, n2, layout);
+    Module['brian_transfer_time'] += performance.now() - start;
+    if (data === null)
+        return;
     if (!(owner in brian_results)) {
         brian_results[owner] = {};
     }
     brian_results[owner][varname] = data;
 }
 
+// Profiling information for runs with profile=True: total time (in seconds)
+// and number of calls of each code object, see _write_arrays
+var brian_profiling = [];
+Module['brian_profiling'] = brian_profiling;
+
+function add_profiling_info(name, time, calls) {
+    brian_profiling.push({name: name, time: time, calls: calls});
+}
+
+// Flag shared with the main thread to pause or cancel a running simulation:
+// an Int32Array on a SharedArrayBuffer (see BrianSimulation), or undefined
+const CONTROL_RUN = 0;
+const CONTROL_PAUSE = 1;
+const CONTROL_CANCEL = 2;
+Module['brian_cancelled'] = false;
+
+// Called regularly by the network loop (see network.cpp). Blocks while the
+// simulation is paused, and returns the time (in seconds) it has been paused.
+// A cancelled simulation is marked in Module['brian_cancelled'], which stays
+// set until the results have been reset for a continuation.
+function check_simulation_control() {
+    const control = Module['brian_control'];
+    if (!control)
+        return 0;
+    let paused = 0;
+    if (Atomics.load(control, 0) === CONTROL_PAUSE) {
+        const start = performance.now();
+        while (Atomics.load(control, 0) === CONTROL_PAUSE)
+            Atomics.wait(control, 0, CONTROL_PAUSE);
+        paused = (performance.now() - start) / 1000;
+    }
+    if (Atomics.load(control, 0) === CONTROL_CANCEL)
+        Module['brian_cancelled'] = true;
+    return paused;
+}
+
+// Clear the results of the previous run before continuing the simulation
+// (see brian_run_for), since _write_arrays sends all results again
+Module['brian_reset_results'] = function () {
+    for (const owner of Object.keys(brian_results))
+        delete brian_results[owner];
+    brian_profiling.length = 0;
+    Module['brian_transfer_time'] = 0;
+    Module['brian_cancelled'] = false;
+};
+
+// Multithreaded builds start a pool of pthread workers for every instance,
+// which is not stopped when the instance is discarded (see worker.js)
+Module['brian_terminate_threads'] = function () {
+    if (typeof PThread !== 'undefined')
+        PThread.terminateAllThreads();
+};
+
+// Incremental delivery of monitor data during a run (see
+// WASMStandaloneDevice.stream_monitor)
+var monitor_chunk = null;
+
+function start_monitor_chunk(owner, start) {
+    monitor_chunk = {type: 'monitor', owner: owner, start: start, data: {}};
+}
+
+function add_monitor_chunk_data(varname, dtype, ptr, n1, n2 = 0, layout = 'per_neuron') {
+    monitor_chunk.data[varname] = result_array(dtype, ptr, n1, n2, layout);
+}
+
+function send_monitor_chunk() {
+    const buffers = [];
+    for (let varname in monitor_chunk.data) {
+        const data = monitor_chunk.data[varname];
+        if (data === null)
+            continue;
+        // all per-neuron arrays share the same buffer
+        const array = Array.isArray(data) ? data[0] : (data.data || data);
+        if (array !== undefined)
+            buffers.push(array.buffer);
+    }
+    postMessage(monitor_chunk, buffers);
+    monitor_chunk = null;
+}
+
+// Typed parameter injection: values in Module['brian_typed_args'] (numbers
+// or typed arrays, keyed by names such as 'neurongroup.v') are copied
+// directly into the WASM heap (see _set_from_javascript in objects.cpp)
+var brian_arrays = {};
+
+function register_array(name, ptr, size, dtype) {
+    brian_arrays[name] = {ptr: ptr, size: size, dtype: dtype};
+}
+
+function typed_argument_count() {
+    const args = Module['brian_typed_args'];
+    return args ? Object.keys(args).length : 0;
+}
+
+function copy_typed_arguments() {
+    const args = Module['brian_typed_args'];
+    for (let name in args) {
+        const info = brian_arrays[name];
+        if (info === undefined)
+            throw new Error(`Cannot set unknown variable '${name}'.`);
+        const array_class = typed_array_class(info.dtype);
+        if (array_class === null)
+            throw new Error(`Cannot set '${name}': unsupported dtype '${info.dtype}'.`);
+        const target = new array_class(HEAPU8.buffer, info.ptr, info.size);
+        let value = args[name];
+        if (ArrayBuffer.isView(value)) {
+            if (value.length !== info.size)
+                throw new Error(`Cannot set '${name}': expected ${info.size} values, got ${value.length}.`);
+            // BigInt64Array can only be set from BigInts, and vice versa
+            if (array_class === BigInt64Array && !(value instanceof BigInt64Array))
+                value = BigInt64Array.from(value, v => BigInt(Math.round(v)));
+            else if (array_class !== BigInt64Array && value instanceof BigInt64Array)
+                value = Array.from(value, Number);
+            target.set(value);
+        } else {
+            // Non-integer values are rounded for integer variables, as for typed arrays
+            if (array_class === BigInt64Array)
+                value = (typeof value === 'bigint') ? value : BigInt(Math.round(Number(value)));
+            else
+                value = Number(value);
+            target.fill(value);
+        }
+    }
+}
+
 Module['print'] = function(text) { console.log('Brian stdout: ' + text) };
 Module['printErr'] = function(text) { console.log('Brian stderr: ' + text) };
@@ -0,0 +1,99 @@
+{# USES_VARIABLES { N, rate, t, _spikespace, _clock_t, _clock_dt,
+                    _num_source_neurons, _source_start, _source_stop } #}
+{# WRITES_TO_READ_ONLY_VARIABLES { N } #}
+{% extends 'common_group.cpp' %}
+
+{% block maincode %}
+    size_t _num_spikes = {{_spikespace}}[_num_spikespace-1];
+    // For subgroups, we do not want to record all spikes
+    // We assume that spikes are ordered
+    int _start_idx = -1;
+    int _end_idx = -1;
+    for(size_t _j=0; _j<_num_spikes; _j++)
+    {
+        const size_t _idx = {{_spikespace}}[_j];
+        if (_idx >= _source_start) {
+            _start_idx = _j;
+            break;
+        }
+    }
+    if (_start_idx == -1)
+        _start_idx = _num_spikes;
+    for(size_t _j=_start_idx; _j<_num_spikes; _j++)
+    {
+        const size_t _idx = {{_spikespace}}[_j];
+        if (_idx >= _source_stop) {
+            _end_idx = _j;
+            break;
+        }
+    }
+    if (_end_idx == -1)
+        _end_idx =_num_spikes;
+    _num_spikes = _end_idx - _start_idx;
+    {{_dynamic_rate}}.push_back(1.0*_num_spikes/{{_clock_dt}}/_num_source_neurons);
+    {{_dynamic_t}}.push_back({{_clock_t}});
+    {{N}}++;
+
+    {% if stream_steps is defined %}
+    // Send the newly recorded values to JavaScript
+    static int _stream_step = 0;
+    if (++_stream_step >= {{stream_steps}})
+    {
+        _stream_step = 0;
+        _stream_{{codeobj_name}}(true);
+    }
+    {% endif %}
+{% endblock %}
+
+{% block extra_functions_cpp %}
+{% if stream_steps is defined %}
+void _stream_{{codeobj_name}}(bool truncate)
+{
+    using namespace brian;
+    %CONSTANTS%
+    {{pointers_lines|autoindent}}
+    // Number of values in the monitor that have already been sent, and the
+    // number of values sent so far (differs if the monitor is truncated)
+    static size_t _stream_sent = 0;
+    static size_t _stream_offset = 0;
+    const size_t _stream_total = {{N}};
+    if (_stream_total == _stream_sent)
+        return;
+    EM_ASM({
+        start_monitor_chunk('{{owner.name}}', $0);
+    }, _stream_offset);
+    EM_ASM({
+        add_monitor_chunk_data('rate', 'double', $0, $1);
+        add_monitor_chunk_data('t', 'double', $2, $1);
+        send_monitor_chunk();
+    }, {{_dynamic_rate}}.data() + _stream_sent, _stream_total - _stream_sent,
+       {{_dynamic_t}}.data() + _stream_sent);
+    _stream_offset += _stream_total - _stream_sent;
+    {% if stream_truncate %}
+    if (truncate)
+    {
+        {{_dynamic_rate}}.clear();
+        {{_dynamic_t}}.clear();
+        {{N}} = 0;
+        _stream_sent = 0;
+        return;
+    }
+    {% endif %}
+    _stream_sent = _stream_total;
+}
+{% endif %}
+{% endblock %}
+
+{% block extra_functions_h %}
+{% if stream_steps is defined %}
+void _stream_{{codeobj_name}}(bool truncate);
+{% endif %}
+{% endblock %}
+
+{% macro main_finalise() %}
+{% if stream_steps is defined %}
+// Keep the last chunk in the monitor, so that it is part of the final results
+_stream_{{codeobj_name}}(false);
+{% endif %}
+{% endmacro %}
+
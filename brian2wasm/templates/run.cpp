@@ -0,0 +1,94 @@
+{% macro cpp_file() %}
+#include<stdlib.h>
+#include "objects.h"
+#include<ctime>
+#include<random>
+
+{% for codeobj in code_objects | sort(attribute='name') %}
+#include "code_objects/{{codeobj.name}}.h"
+{% endfor %}
+
+{% for name in user_headers | sort %}
+#include {{name}}
+{% endfor %}
+
+void brian_start()
+{
+	_init_arrays();
+	_load_arrays();
+	// Initialize clocks (link timestep and dt to the respective arrays)
+    {% for clock in clocks | sort(attribute='name') %}
+    brian::{{clock.name}}.timestep = brian::{{array_specs[clock.variables['timestep']]}};
+    brian::{{clock.name}}.dt = brian::{{array_specs[clock.variables['dt']]}};
+    brian::{{clock.name}}.t = brian::{{array_specs[clock.variables['t']]}};
+    {% endfor %}
+}
+
+void brian_end()
+{
+	_write_arrays();
+	// The arrays are not deallocated, so that brian_run_for can continue the
+	// simulation. Their memory is released together with the WebAssembly instance.
+}
+
+void (*_continue_network_run)(double) = NULL;
+Network* _resumable_network = NULL;
+
+extern "C" {
+
+// Continue the last network run for the given duration (in seconds), starting
+// from the state at its end, and send the results to JavaScript
+void brian_run_for(double duration)
+{
+	if (_continue_network_run == NULL)
+		return;
+	_continue_network_run(duration);
+	_write_arrays();
+}
+
+// The current time (in seconds) of the last network that has been run
+double brian_get_time()
+{
+	if (_resumable_network == NULL)
+		return 0.0;
+	return _resumable_network->t;
+}
+
+}
+
+{% for name, lines in run_funcs.items() | sort(attribute='name') %}
+void {{name}}()
+{
+	using namespace brian;
+
+    {{lines|autoindent}}
+}
+
+{% endfor %}
+
+{% endmacro %}
+
+/////////////////////////////////////////////////////////////////////////////////////////////////////
+
+{% macro h_file() %}
+
+#include "network.h"
+
+void brian_start();
+void brian_end();
+
+// Set by the code of the last network run in main (see
+// WASMStandaloneDevice.network_run)
+extern void (*_continue_network_run)(double);
+extern Network* _resumable_network;
+
+extern "C" {
+void brian_run_for(double duration);
+double brian_get_time();
+}
+
+{% for name, lines in run_funcs.items() | sort(attribute='name') %}
+void {{name}}();
+{% endfor %}
+
+{% endmacro %}
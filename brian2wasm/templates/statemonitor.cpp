@@ -0,0 +1,112 @@
+{# USES_VARIABLES { t, _clock_t, _indices, N } #}
+{# WRITES_TO_READ_ONLY_VARIABLES { t, N } #}
+{% extends 'common_group.cpp' %}
+
+{% block maincode %}
+    {{_dynamic_t}}.push_back({{_clock_t}});
+
+    const size_t _new_size = {{_dynamic_t}}.size();
+    // Resize the dynamic arrays
+    {% for varname, var in _recorded_variables | dictsort %}
+    {% set _recorded =  get_array_name(var, access_data=False) %}
+    {{_recorded}}.resize(_new_size, _num_indices);
+    {% endfor %}
+
+    // scalar code
+    const size_t _vectorisation_idx = -1;
+    {{scalar_code|autoindent}}
+
+    {{ openmp_pragma('parallel-static') }}
+    for (int _i = 0; _i < (int)_num_indices; _i++)
+    {
+        // vector code
+        const size_t _idx = {{_indices}}[_i];
+        const size_t _vectorisation_idx = _idx;
+        {{vector_code|autoindent}}
+
+        {% for varname, var in _recorded_variables | dictsort %}
+        {% set _recorded =  get_array_name(var, access_data=False) %}
+        {% if c_data_type(var.dtype) == 'bool' %}
+        {{ openmp_pragma('critical') }}
+        { // std::vector<bool> is not threadsafe
+        {{_recorded}}(_new_size-1, _i) = _to_record_{{varname}};
+        }
+        {% else %}
+        {{_recorded}}(_new_size-1, _i) = _to_record_{{varname}};
+        {% endif %}
+        {% endfor %}
+    }
+
+    {{N}} = _new_size;
+
+    {% if stream_steps is defined %}
+    // Send the newly recorded values to JavaScript
+    static int _stream_step = 0;
+    if (++_stream_step >= {{stream_steps}})
+    {
+        _stream_step = 0;
+        _stream_{{codeobj_name}}(true);
+    }
+    {% endif %}
+{% endblock %}
+
+{% block extra_functions_cpp %}
+{% if stream_steps is defined %}
+void _stream_{{codeobj_name}}(bool truncate)
+{
+    using namespace brian;
+    %CONSTANTS%
+    {{pointers_lines|autoindent}}
+    // Number of time steps in the monitor that have already been sent, and the
+    // number of time steps sent so far (differs if the monitor is truncated)
+    static size_t _stream_sent = 0;
+    static size_t _stream_offset = 0;
+    const size_t _stream_total = {{_dynamic_t}}.size();
+    if (_stream_total == _stream_sent)
+        return;
+    EM_ASM({
+        start_monitor_chunk('{{owner.name}}', $0);
+        add_monitor_chunk_data('t', 'double', $1, $2);
+    }, _stream_offset, {{_dynamic_t}}.data() + _stream_sent, _stream_total - _stream_sent);
+    {% for varname, var in _recorded_variables | dictsort %}
+    {% set _recorded =  get_array_name(var, access_data=False) %}
+    {
+        std::vector<{{c_data_type(var.dtype)}}> _flat = _flatten_2d({{_recorded}}, _stream_sent, {{ 'true' if result_2d_layout == 'per_neuron' else 'false' }});
+        EM_ASM({
+            add_monitor_chunk_data('{{varname}}', '{{c_data_type(var.dtype)}}', $0, $1, $2, '{{result_2d_layout}}');
+        }, _flat.data(), _stream_total - _stream_sent, {{_recorded}}.m);
+    }
+    {% endfor %}
+    EM_ASM({
+        send_monitor_chunk();
+    });
+    _stream_offset += _stream_total - _stream_sent;
+    {% if stream_truncate %}
+    if (truncate)
+    {
+        {{_dynamic_t}}.clear();
+        {% for varname, var in _recorded_variables | dictsort %}
+        {{get_array_name(var, access_data=False)}}.resize(0, _num_indices);
+        {% endfor %}
+        {{N}} = 0;
+        _stream_sent = 0;
+        return;
+    }
+    {% endif %}
+    _stream_sent = _stream_total;
+}
+{% endif %}
+{% endblock %}
+
+{% block extra_functions_h %}
+{% if stream_steps is defined %}
+void _stream_{{codeobj_name}}(bool truncate);
+{% endif %}
+{% endblock %}
+
+{% macro main_finalise() %}
+{% if stream_steps is defined %}
+// Keep the last chunk in the monitor, so that it is part of the final results
+_stream_{{codeobj_name}}(false);
+{% endif %}
+{% endmacro %}
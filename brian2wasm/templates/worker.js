@@ -1,17 +1,307 @@
-importScripts('./wasm_module.js');
+importScripts('./brian_config.js');
 
-self.onmessage = e => {
+// Packaged builds (see brian2wasm.deploy) load files under content-hashed names
+function asset_url(name) {
+    const urls = brian_config.asset_urls || {};
+    return urls[name] || name;
+}
+
+importScripts(asset_url('wasm_module.js'));
+
+// The WebAssembly module is fetched and compiled only once per worker, every
+// run then creates a new (cheap) instance from the compiled module.
+let wasm_module = null;
+// Preloaded file packages (e.g. static arrays), keyed by package name
+const preloaded_packages = {};
+
+// With the browser_cache preference, the WebAssembly code is stored in the
+// browser's Cache Storage, keyed by the hash of the build
+const wasm_cache_name = 'brian2wasm';
+
+function fetch_wasm() {
+    const url = new URL(asset_url('wasm_module.wasm'), location.href).href;
+    if (!brian_config.browser_cache || !brian_config.build_hash || !self.caches)
+        return fetch(url);
+    const key = `${url}?build=${brian_config.build_hash}`;
+    // Cache Storage is not available everywhere (e.g. on insecure origins)
+    return caches.open(wasm_cache_name).then(cache => cache.match(key).then(cached => {
+        if (cached)
+            return cached;
+        return fetch(url).then(response => {
+            if (response.ok) {
+                cache.put(key, response.clone());
+                // Remove the code of earlier builds
+                cache.keys().then(requests => requests.forEach(request => {
+                    if (request.url.startsWith(url + '?build=') && request.url !== key)
+                        cache.delete(request);
+                }));
+            }
+            return response;
+        });
+    }), () => fetch(url));
+}
+
+function compile_wasm_module() {
+    if (wasm_module === null) {
+        let compiled;
+        if (WebAssembly.compileStreaming) {
+            compiled = WebAssembly.compileStreaming(fetch_wasm());
+        } else {
+            compiled = Promise.reject();
+        }
+        // Fall back to a non-streaming compilation, e.g. if the server does
+        // not send the correct MIME type for .wasm files
+        wasm_module = compiled.catch(() => fetch_wasm()
+            .then(response => response.arrayBuffer())
+            .then(bytes => WebAssembly.compile(bytes)));
+    }
+    return wasm_module;
+}
+
+function create_instance(compiled, options) {
+    return Module({
+        ...options,
+        // Threads of multithreaded builds load the module script, not the worker script
+        mainScriptUrlOrBlob: asset_url('wasm_module.js'),
+        locateFile: (path, prefix) => prefix + asset_url(path),
+        instantiateWasm: (imports, success) => {
+            WebAssembly.instantiate(compiled, imports).then(instance => success(instance, compiled));
+            return {};  // instantiation is asynchronous
+        },
+        getPreloadedPackage: (name, size) => {
+            // Emscripten asks for the package under the name given by locateFile
+            for (const package_name in preloaded_packages) {
+                if (name === package_name || name === asset_url(package_name))
+                    return preloaded_packages[package_name];
+            }
+            // Let Emscripten download the package itself
+            return null;
+        }
+    });
+}
+
+// Static arrays that are fetched as individual files (see the
+// static_array_loading preference), downloaded only once per worker
+let static_arrays = null;
+
+function fetch_static_arrays() {
+    if (static_arrays === null) {
+        static_arrays = Promise.all(brian_config.static_arrays.map(name =>
+            fetch(asset_url(name)).then(response => {
+                if (!response.ok)
+                    throw new Error(`Could not fetch ${name}`);
+                return response.arrayBuffer();
+            }).then(data => [name, data])));
+    }
+    return static_arrays;
+}
+
+function write_static_arrays(module, files) {
+    if (files.length && !module.FS.analyzePath('static_arrays').exists)
+        module.FS.mkdir('static_arrays');
+    for (const [name, data] of files) {
+        module.FS.writeFile(name, new Uint8Array(data));
+    }
+}
+
+// File packages (see brian_config.preloaded_packages) are downloaded only once
+// per worker, and handed to every instance via getPreloadedPackage
+let packages = null;
+
+function fetch_packages() {
+    if (packages === null) {
+        packages = Promise.all((brian_config.preloaded_packages || []).map(name =>
+            fetch(new URL(asset_url(name), location.href).href)
+                .then(response => response.ok ? response.arrayBuffer() : null)
+                // Emscripten downloads the package itself if this fails
+                .catch(() => null)
+                .then(data => {
+                    if (data !== null)
+                        preloaded_packages[name] = data;
+                })));
+    }
+    return packages;
+}
+
+// Collect the buffers of all typed arrays in the results, so that they can be
+// transferred to the main thread instead of being copied
+function transferables(results) {
+    const buffers = new Set();
+    const collect = value => {
+        if (ArrayBuffer.isView(value)) {
+            if (value.buffer instanceof ArrayBuffer)  // not shared memory
+                buffers.add(value.buffer);
+        } else if (Array.isArray(value)) {
+            value.forEach(collect);
+        } else if (value !== null && typeof value === 'object') {
+            Object.values(value).forEach(collect);
+        }
+    };
+    collect(results);
+    return Array.from(buffers);
+}
+
+// Start compiling as soon as the worker is created, not only on the first run.
+// Workers of a BrianSimulation pool receive the compiled module instead.
+if (self.name !== 'brian_pool')
+    compile_wasm_module();
+fetch_static_arrays();
+fetch_packages();
+
+// Sort the profiling information by time, and add each code object's share of
+// the total time spent in all code objects
+function profiling_summary(entries) {
+    const total = entries.reduce((sum, entry) => sum + entry.time, 0);
+    return entries.map(entry => ({...entry, share: total > 0 ? entry.time / total : 0}))
+        .sort((a, b) => b.time - a.time);
+}
+
+// Read all result files that the simulation wrote to the (in-memory) file system
+function read_result_files(module) {
+    const files = {};
+    for (let name of module.FS.readdir('results')) {
+        if (name !== '.' && name !== '..')
+            files[name] = module.FS.readFile('results/' + name);
+    }
+    return files;
+}
+
+// Flag to pause or cancel a running simulation, shared with the main thread
+// (see check_simulation_control in pre.js)
+let control = null;
+
+// Promise for the instance of the last run (or null), kept alive so that the
+// simulation can be continued from its final state. Continuations are chained
+// to this promise, so that they wait for a run that is still starting up.
+let simulation = null;
+
+// Drop the instance of the last run, stopping its threads once any pending
+// continuation has finished
+function discard_simulation() {
+    if (simulation !== null) {
+        simulation.then(module => {
+            if (module !== null)
+                module['brian_terminate_threads']();
+        });
+    }
+    simulation = null;
+}
+
+function send_results(module, id, write_files, timings) {
+    const start = performance.now();
+    const message = { type: 'results', results: module['brian_results'], id: id,
+                      t: module._brian_get_time(), cancelled: module['brian_cancelled'],
+                      timings: timings };
+    if (module['brian_profiling'].length)
+        message.profiling = profiling_summary(module['brian_profiling']);
+    if (write_files)
+        message.files = read_result_files(module);
+    timings.transfer = module['brian_transfer_time'] + performance.now() - start;
+    postMessage(message, transferables(message));
+}
+
+// Errors (e.g. an abort of the simulation, or an unknown variable name in the
+// arguments) are sent to the page instead of being lost in a rejected promise
+function report_error(id, error) {
+    console.error(error);
+    postMessage({type: 'error', id: id, message: String((error && error.message) || error)});
+}
+
+function run(args, id, write_files, seed) {
+    // Numbers and typed arrays are copied directly into the simulation's
+    // memory, other values (e.g. file names) are passed as command line
+    // arguments
     _arguments = [];
-    if (e.data) {
-        args = e.data;
+    const typed_args = {};
+    if (args) {
         for (let key in args) {
-            _arguments.push(`${key}=${args[key]}`);
+            const value = args[key];
+            if (typeof value === 'number' || typeof value === 'boolean' ||
+                    typeof value === 'bigint' || ArrayBuffer.isView(value))
+                typed_args[key] = value;
+            else
+                _arguments.push(`${key}=${value}`);
         }
     }
 
-    Module().then(function (module) {
+    const options = {brian_write_result_files: Boolean(write_files),
+                     brian_typed_args: typed_args,
+                     brian_control: control,
+                     brian_seed: seed};
+    let static_files = [];
+    // Durations (in ms) of the phases of the run, sent with the results
+    const timings = {};
+    let start;
+    discard_simulation();
+    const instance = Promise.all([compile_wasm_module(), fetch_static_arrays(), fetch_packages()]).then(([compiled, files]) => {
+        static_files = files;
+        start = performance.now();
+        return create_instance(compiled, options);
+    }).then(function (module) {
+        write_static_arrays(module, static_files);
+        timings.instantiate = performance.now() - start;
         console.log(_arguments);
+        start = performance.now();
         module.callMain(_arguments);
-        postMessage({ type: 'results', results: module['brian_results'] })
+        // Copying the results out of the WebAssembly memory is part of main
+        timings.run = performance.now() - start - module['brian_transfer_time'];
+        send_results(module, id, write_files, timings);
+        return module;
     });
-};
\ No newline at end of file
+    // A failed run leaves nothing to continue
+    simulation = instance.catch(() => null);
+    instance.catch(error => report_error(id, error));
+}
+
+// Continue the last run for another duration (in seconds), starting from its
+// final state. The results contain everything recorded since the start of
+// the first run.
+function continue_run(duration, id, write_files) {
+    if (typeof duration !== 'number' || !(duration > 0) || !isFinite(duration)) {
+        report_error(id, new Error(`The duration has to be a positive number of seconds, not ${duration}.`));
+        return;
+    }
+    const continued = (simulation || Promise.resolve(null)).then(module => {
+        if (module === null)
+            throw new Error('There is no simulation to continue, start a run first.');
+        module['brian_reset_results']();
+        module['brian_write_result_files'] = Boolean(write_files);
+        module['brian_control'] = control;
+        const timings = {};
+        const start = performance.now();
+        module._brian_run_for(duration);
+        timings.run = performance.now() - start - module['brian_transfer_time'];
+        send_results(module, id, write_files, timings);
+        return module;
+    });
+    simulation = continued.catch(() => null);
+    continued.catch(error => report_error(id, error));
+}
+
+// Messages are either {type: 'init', module} with an already compiled
+// WebAssembly.Module, {type: 'get_module'} to receive the compiled module in
+// a {type: 'module', module} message, {type: 'run', args, id, write_files, seed}
+// (answered with a {type: 'results'} or {type: 'error', id, message} message),
+// {type: 'continue', duration, id, write_files} to continue the last run,
+// {type: 'reset'} to discard its state, {type: 'control', buffer} with the
+// SharedArrayBuffer for pausing and cancelling runs, or (for compatibility) the arguments
+// for a run. With write_files, the result files in Brian's binary format are
+// sent back as well (in the 'files' property)
+self.onmessage = e => {
+    const message = e.data;
+    if (message && message.type === 'init') {
+        wasm_module = Promise.resolve(message.module);
+    } else if (message && message.type === 'get_module') {
+        compile_wasm_module().then(module => postMessage({type: 'module', module: module}));
+    } else if (message && message.type === 'run') {
+        run(message.args, message.id, message.write_files, message.seed);
+    } else if (message && message.type === 'continue') {
+        continue_run(message.duration, message.id, message.write_files);
+    } else if (message && message.type === 'reset') {
+        discard_simulation();
+    } else if (message && message.type === 'control') {
+        control = new Int32Array(message.buffer);
+    } else {
+        run(message);
+    }
+};
@@ -19,9 +19,9 @@ eqs = """
 dV/dt = (-V+muext + sigmaext * sqrt(tau) * xi)/tau : volt
 """
 
-from brian2wasm.functions import send_spike
+from brian2wasm.functions import stream_spike
 group = NeuronGroup(N, eqs, threshold='V > theta',
-                    reset='V = Vr; dummy = send_spike(i, t)',
+                    reset='V = Vr; dummy = stream_spike(i, t)',
                     refractory=2*ms, method='euler')
 group.V = Vr
 conn = Synapses(group, group, on_pre='V += -J', delay=delta)